@@ -0,0 +1,365 @@
+"""Read-only HTTP API over the country, industry and firm datasets.
+
+    python api.py --port 8502
+
+Endpoints (all GET):
+
+    /v1/country   ?indicator=ccii,gwe&year_from=2015&year_to=2020&country=usa&country=uk
+    /v1/industry  ?indicator=gwe&industry=apparel&year=2020
+    /v1/firm      ?continent=europe&industry=services&year=2021&limit=100
+    /v1/firm/aggregate ?by=continent,year&indicator=ccii&stats=mean,count
+    /v1/datasets  dataset hashes and row counts
+
+Indicators, years, ``by`` and ``stats`` take comma-separated lists.
+Country, continent and industry names can contain commas ("food, beverage
+& agriculture"), so repeat those parameters to select several.
+
+Add ``format=arrow`` (or send ``Accept: application/vnd.apache.arrow.stream``)
+for an Arrow IPC stream instead of JSON. Responses carry a strong ETag
+derived from the data file hash and the normalised query, so repeated
+polling with If-None-Match costs a 304. Bodies are brotli-compressed when
+the optional ``brotli`` package is installed, otherwise gzip.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+import data_store
+from firm_query import DIMENSIONS, FirmQuery, MEASURES, STATS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# =========================
+# 数据（按文件哈希缓存，数据更新后自动重新加载）
+# =========================
+class Datasets:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = {}
+
+    def get(self, name):
+        version = data_store.publish(name)
+        sha = data_store.dataset_info(name, version)["sha256"]
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached is not None and cached[0] == sha:
+                return sha, cached[1]
+        table = data_store.read_table(name, version)
+        value = FirmQuery(table) if name == "firm" else data_store.freeze(table.to_pandas())
+        with self._lock:
+            self._loaded[name] = (sha, value)
+        return sha, value
+
+
+datasets = Datasets()
+
+
+# =========================
+# 查询参数
+# =========================
+# 实体名称本身可能含逗号，只能用重复参数传多个值
+ENTITY_PARAMS = ("country", "continent", "industry")
+
+
+def _split(params, key):
+    if key in ENTITY_PARAMS:
+        return [v.strip() for v in params.get(key, []) if v.strip()]
+    values = []
+    for raw in params.get(key, []):
+        values.extend(v.strip() for v in raw.split(",") if v.strip())
+    return values
+
+
+def _year_filter(params):
+    years = [int(y) for y in _split(params, "year")]
+    year_from = params.get("year_from", [None])[0]
+    year_to = params.get("year_to", [None])[0]
+    if years and (year_from or year_to):
+        raise BadRequest("use either year or year_from/year_to")
+    if year_from or year_to:
+        return ("range", int(year_from) if year_from else None, int(year_to) if year_to else None)
+    return ("in", years) if years else None
+
+
+def _indicators(params, available):
+    indicators = _split(params, "indicator") or list(available)
+    unknown = [i for i in indicators if i not in available]
+    if unknown:
+        raise BadRequest(f"unknown indicator(s): {', '.join(unknown)}")
+    return indicators
+
+
+ALLOWED_PARAMS = {
+    "country": {"indicator", "year", "year_from", "year_to", "country", "format"},
+    "industry": {"indicator", "year", "year_from", "year_to", "industry", "format"},
+    "firm": {"indicator", "year", "year_from", "year_to", "country", "continent",
+             "industry", "format", "limit"},
+    "firm/aggregate": {"indicator", "year", "year_from", "year_to", "country", "continent",
+                       "industry", "by", "stats", "format"},
+}
+
+
+def normalise_query(dataset, params):
+    extra = set(params) - ALLOWED_PARAMS[dataset]
+    if extra:
+        raise BadRequest(f"unsupported parameter(s): {', '.join(sorted(extra))}")
+    return json.dumps(
+        {k: sorted(_split(params, k)) for k in sorted(params)}, sort_keys=True
+    )
+
+
+# =========================
+# 各数据集的查询
+# =========================
+def _filter_years(df, years):
+    if years is None:
+        return df
+    if years[0] == "in":
+        return df[df["year"].isin(years[1])]
+    _, lo, hi = years
+    mask = True
+    if lo is not None:
+        mask = mask & (df["year"] >= lo)
+    if hi is not None:
+        mask = mask & (df["year"] <= hi)
+    return df[mask]
+
+
+def query_frame(df, params, entity, measures):
+    indicators = _indicators(params, [m for m in measures if m in df.columns])
+    df = _filter_years(df, _year_filter(params))
+    entities = _split(params, entity)
+    if entities:
+        df = df[df[entity].isin(entities)]
+    columns = [entity, "year"] + (["iso3"] if "iso3" in df.columns else []) + indicators
+    return pa.Table.from_pandas(df[columns].reset_index(drop=True), preserve_index=False)
+
+
+def _firm_years(engine, params):
+    years = _year_filter(params)
+    if years is None:
+        return None
+    if years[0] == "in":
+        return years[1]
+    _, lo, hi = years
+    return [y for y in engine.years
+            if (lo is None or y >= lo) and (hi is None or y <= hi)]
+
+
+def _firm_filters(engine, params):
+    return dict(
+        year=_firm_years(engine, params),
+        country=_split(params, "country") or None,
+        continent=_split(params, "continent") or None,
+        industry=_split(params, "industry") or None,
+    )
+
+
+def query_firm(engine, params):
+    indicators = _indicators(params, MEASURES)
+    columns = list(DIMENSIONS) + indicators
+    table = engine.select(columns=columns, **_firm_filters(engine, params))
+    limit = params.get("limit", [None])[0]
+    if limit is not None:
+        limit = int(limit)
+        if limit < 0:
+            raise BadRequest("limit must not be negative")
+        table = table.slice(0, limit)
+    return table
+
+
+def query_firm_aggregate(engine, params):
+    by = _split(params, "by") or ["year"]
+    bad = [b for b in by if b not in DIMENSIONS]
+    if bad:
+        raise BadRequest(f"cannot group by: {', '.join(bad)}")
+    stats = _split(params, "stats") or ["mean", "count"]
+    bad = [s for s in stats if s not in STATS]
+    if bad:
+        raise BadRequest(f"unknown stat(s): {', '.join(bad)}")
+    frame = engine.aggregate(by, metrics=_indicators(params, MEASURES), stats=stats,
+                             **_firm_filters(engine, params))
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+ROUTES = {
+    "/v1/country": ("country", lambda df, p: query_frame(df, p, "country", MEASURES)),
+    "/v1/industry": ("industry", lambda df, p: query_frame(df, p, "industry", MEASURES)),
+    "/v1/firm": ("firm", query_firm),
+    "/v1/firm/aggregate": ("firm", query_firm_aggregate),
+}
+
+
+# =========================
+# 编码
+# =========================
+def encode(table, fmt):
+    if fmt == "arrow":
+        sink = io.BytesIO()
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue(), ARROW_MIME
+    rows = table.to_pylist()
+    body = json.dumps({"columns": table.column_names, "rows": rows},
+                      allow_nan=False, default=str, separators=(",", ":"))
+    return body.encode("utf-8"), "application/json"
+
+
+def choose_encoding(accept_encoding):
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+def _round_float32(col):
+    # float32 转成 Python float 会带出多余的尾数，按 float32 的有效位数（7 位）取整
+    values = col.to_numpy(zero_copy_only=False).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exponent = np.floor(np.log10(np.abs(values)))
+    scale = np.where(np.isfinite(exponent), 10.0 ** (6 - exponent), 1.0)
+    return pa.array(np.round(values * scale) / scale, mask=np.isnan(values))
+
+
+def _clean_nan(table):
+    # JSON 不支持 NaN，统一转成 null
+    columns = []
+    for col in table.columns:
+        if col.type == pa.float32():
+            col = _round_float32(col)
+        elif pa.types.is_floating(col.type):
+            col = pc.if_else(pc.is_nan(col), None, col)
+        columns.append(col)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "GreenwashingIndexAPI/1.0"
+
+    def do_GET(self):
+        try:
+            self._handle()
+        except BadRequest as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc))
+        except ValueError as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"invalid value: {exc}")
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == "/v1/datasets":
+            manifest = data_store.load_manifest()
+            info = {name: {k: manifest.get(name, {}).get(k) for k in ("sha256", "rows")}
+                    for name in data_store.DATASETS}
+            self._send(json.dumps(info).encode("utf-8"), "application/json", etag=None)
+            return
+
+        if url.path not in ROUTES:
+            self._send_error(HTTPStatus.NOT_FOUND, f"unknown endpoint {url.path}")
+            return
+
+        name, run = ROUTES[url.path]
+        route = url.path[len("/v1/"):]
+        fmt = params.get("format", [None])[0]
+        if fmt is None:
+            fmt = "arrow" if ARROW_MIME in self.headers.get("Accept", "") else "json"
+        if fmt not in ("json", "arrow"):
+            raise BadRequest("format must be json or arrow")
+
+        sha, data = datasets.get(name)
+        query = normalise_query(route, params)
+        # 强 ETag：不同压缩方式是不同的字节表示，需要不同的 ETag
+        encoding = choose_encoding(self.headers.get("Accept-Encoding", ""))
+        key = f"{sha}|{route}|{fmt}|{encoding}|{query}"
+        etag = '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+
+        table = run(data, params)
+        if fmt == "json":
+            table = _clean_nan(table)
+        body, content_type = encode(table, fmt)
+        self._send(body, content_type, etag, encoding)
+
+    def _send(self, body, content_type, etag, encoding=None):
+        body = compress(body, encoding)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept, Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    data_store.publish_all()
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"serving on http://{args.host}:{args.port}/v1/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
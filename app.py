@@ -1,7 +1,17 @@
+import os
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+import cube
+import data_coverage
+import data_store
+import export_static
+import figures
+import firm_query
+import like_counter
+import quadrants
+import rankings
+import stats_table
 
 
 # =========================
@@ -49,12 +59,15 @@ st.markdown(
 
     In addition to the global map, users can also explore:
 
-    •  **Top 10 Countries by Climate Commitment and Greenwashing Indices**  
-    This section highlights the leading countries each year in terms of climate commitment (CCII) and potential greenwashing behavior (GWE and GWGHG), allowing users to track which countries are setting ambitious climate commitments and which may exhibit symbolic or formalistic disclosures.
+    •  **Top Countries by Climate Commitment and Greenwashing Indices**  
+    This section highlights the leading 5 to 20 countries (your choice) each year in terms of climate commitment (CCII) and potential greenwashing behavior (GWE and GWGHG), allowing users to track which countries are setting ambitious climate commitments and which may exhibit symbolic or formalistic disclosures.
 
     •  **Industry-level Climate Commitment vs Greenwashing**  
     This animated scatter plot visualizes industries' climate commitment (CCII) against greenwashing intensity (GWE or GWGHG) over time. The four-quadrant layout helps identify industries with substantive commitments versus symbolic or potentially greenwashing behavior, enabling a clear comparison of commitment and actual performance across sectors.
 
+    •  **Continent-level Climate Commitment and Greenwashing**  
+    Firm-level indices averaged by continent and year, shown on the map and as one small line chart per continent.
+
 
     These indices were developed using the state-of-the-art **[ClimateBERT Large Language Model](https://www.chatclimate.ai/climatebert)**
     combined with **[CDP Questionnaires](https://www.cdp.net/en)** from the world's largest greenhouse gas disclosure organization.
@@ -81,115 +94,136 @@ st.markdown("---")
 st.subheader("🌍 Global Climate Commitment and Greenwashing Indices")
 
 # =========================
-# 读取数据
+# 数据更新监测：后台线程发现 CSV 变化后重新导入并切换版本，无需重启
 # =========================
-@st.cache_data
-def load_data():
-    df = pd.read_csv("countrylevel.csv")
-    df["year"] = df["year"].astype(int)
-    return df
+def drop_stale_figures(name, version):
+    figures.figure_cache.discard(lambda key: key[1] == name and key[2] != version)
 
-df = load_data()
+def refresh_cube(name, version):
+    # 企业数据更新后、切换版本前在后台线程里增量重建聚合立方体，
+    # 会话拿到新版本时立方体已就绪，不占用重跑时间
+    if name == "firm":
+        cube.build_cube(version)
 
-# =========================
-# 指标选择模块
-# =========================
-indicator = st.radio(
-    "Select Indicator:",
-    ("CCII", "GWE", "GWGHG"),
-    horizontal=True
-)
+@st.cache_resource
+def get_data_watcher():
+    watcher = data_store.DataWatcher()
+    watcher.prepare(refresh_cube)
+    watcher.subscribe(drop_stale_figures)
+    return watcher.start()
 
-# =========================
-# 指标配置
-# =========================
-indicator_config = {
-    "CCII": {
-        "column": "ccii",
-        "title": "Climate Commitment Intensity Index (CCII)",
-        "colorscale": ["#cce6ff", "#3399ff", "#003366"]  # 蓝
-    },
-    "GWE": {
-        "column": "gwe",
-        "title": "Greenwashing based on Environmental Score (GWE)",
-        "colorscale": ["#d9f2d9", "#4caf50", "#1b5e20"]  # 绿
-    },
-    "GWGHG": {
-        "column": "gwghg",
-        "title": "Greenwashing based on Carbon Emissions (GWGHG)",
-        "colorscale": ["#f5cccc", "#e53935", "#7f0000"]  # 红
-    }
-}
-
-col = indicator_config[indicator]["column"]
-title_name = indicator_config[indicator]["title"]
-scale = indicator_config[indicator]["colorscale"]
-
-# =========================
-# 用户选择模式
-# =========================
-mode = st.radio(
-    "Display Mode:",
-    ("Single Year", "Animate Over Years")
-)
+data_watcher = get_data_watcher()
 
 # =========================
-# 单年份地图
-# =========================
-if mode == "Single Year":
-    year = st.selectbox(
-        "Select Year",
-        sorted(df["year"].unique())
-    )
-    df_plot = df[df["year"] == year]
-
-    fig = px.choropleth(
-        df_plot,
-        locations="country",
-        locationmode="country names",
-        color=col,
-        color_continuous_scale=scale,
-        hover_name="country",
-        hover_data={
-            "year": True,
-            col: True
-        },
-        title=f"Global Distribution of {title_name} ({year})"
-    )
-
-# =========================
-# 动画地图
-# =========================
-else:
-    fig = px.choropleth(
-        df,
-        locations="country",
-        locationmode="country names",
-        color=col,
-        color_continuous_scale=scale,
-        hover_name="country",
-        hover_data={
-            "year": True,
-            col: True
-        },
-        animation_frame="year",
-        title=f"Global Distribution of {title_name} (Animated)"
+# 读取数据
+# 只读数据集用 cache_resource 共享同一份对象（cache_data 每次调用都会复制），
+# 修改会抛出 ReadOnlyError，需要修改时先 .copy()
+# 以数据版本为缓存键：数据更新后下一次重跑读取新版本，正在进行的重跑继续用旧数据
+# 重跑只读取后台线程已发布的版本，从不触发导入
+# =========================
+@st.cache_resource(max_entries=2)
+def load_data(version):
+    return data_store.freeze(data_store.load_dataset("country", version))
+
+# 导入时已统计好的每年每国非空数量，渲染时不再逐次 isna()
+@st.cache_resource(max_entries=2)
+def load_country_coverage(version):
+    return data_store.freeze(data_store.load_coverage("country", version))
+
+@st.cache_resource(max_entries=2)
+def load_unmatched_countries(version):
+    return tuple(data_store.unmatched_countries("country", version))
+
+# =========================
+# Lite 模式：直接展示 export_static.py 预渲染的图，不在请求时运行 Plotly
+# 图片和 HTML 按 URL 引用（/app/static/ 或 CDN），由浏览器直接下载，不经过 websocket
+# =========================
+lite_mode = st.query_params.get("lite") == "1" or os.environ.get("GW_LITE") == "1"
+static_assets = None
+static_base = None
+if lite_mode:
+    static_assets = export_static.load_manifest()
+    if static_assets is None or not export_static.is_current(static_assets,
+                                                             data_watcher.versions):
+        st.warning("Pre-rendered charts are missing or out of date; showing live charts.")
+        static_assets = None
+    else:
+        static_base = export_static.base_url(static_assets)
+        if static_base is None:
+            st.warning("Pre-rendered charts are not under static/ and have no base URL; "
+                       "showing live charts.")
+            static_assets = None
+
+def show_static_asset(spec, height=680):
+    for fmt in export_static.IMAGE_FORMATS:
+        url = export_static.asset_url(static_assets, spec, fmt, static_base)
+        if url:
+            st.image(url)
+            return
+    url = export_static.asset_url(static_assets, spec, "html", static_base)
+    if url:
+        st.iframe(url, height=height)
+        return
+    st.info("This view has not been pre-rendered yet.")
+
+# 每个板块放在独立的 fragment 里：板块内的控件只重跑本板块
+@st.fragment
+def global_map_section():
+    version = data_watcher.version("country")
+    df = load_data(version)
+
+    # =========================
+    # 指标选择模块
+    # =========================
+    indicator = st.radio(
+        "Select Indicator:",
+        tuple(figures.INDICATOR_CONFIG),
+        horizontal=True
     )
 
-# =========================
-# 统一暗色风格
-# =========================
-fig.update_layout(
-    margin=dict(l=0, r=0, t=60, b=0),
-    paper_bgcolor="#0E1117",
-    plot_bgcolor="#0E1117",
-    font_color="white",
-    coloraxis_colorbar=dict(
-        title=indicator
+    # =========================
+    # 用户选择模式
+    # =========================
+    mode = st.radio(
+        "Display Mode:",
+        ("Single Year", "Animate Over Years")
     )
-)
 
-st.plotly_chart(fig, use_container_width=True)
+    # =========================
+    # 地图（按 指标/模式/年份 缓存）
+    # =========================
+    if mode == "Single Year":
+        year = st.selectbox(
+            "Select Year",
+            sorted(df["year"].unique())
+        )
+    else:
+        year = None
+
+    no_data = []
+    if year is not None:
+        column = figures.INDICATOR_CONFIG[indicator]["column"]
+        no_data = data_coverage.missing(load_country_coverage(version), column, year, "country")
+
+    if static_assets is not None:
+        show_static_asset(("choropleth", indicator, "animated" if year is None else int(year)))
+    else:
+        fig = figures.choropleth(df, indicator, mode, year, version)
+        if no_data and st.checkbox("Grey out countries without data", key="map_show_no_data"):
+            codes = df[["country", "iso3"]].drop_duplicates("country").set_index("country")["iso3"]
+            codes = codes.reindex(no_data).dropna()
+            fig = figures.add_no_data_layer(fig, codes.to_numpy(), codes.index)
+        st.plotly_chart(fig, use_container_width=True)
+
+    if no_data:
+        st.caption(f"No {indicator} data for {year} ({len(no_data)} countries): "
+                   f"{', '.join(no_data)}")
+
+    unmatched = load_unmatched_countries(version)
+    if unmatched:
+        st.caption(f"Not shown on the map (no ISO-3 code): {', '.join(unmatched)}")
+
+global_map_section()
 
 st.markdown(f"""
 Hover over the colored block to view the specific parameters.
@@ -197,10 +231,10 @@ Hover over the colored block to view the specific parameters.
 
 
 # =========================
-# Top 10 CCII, GWE, GWGHG排名
+# Top N CCII, GWE, GWGHG排名
 # =========================
 st.markdown("---")
-st.subheader("📈 Top 10 Countries by Climate Commitment and Greenwashing Indices")
+st.subheader("📈 Top Countries by Climate Commitment and Greenwashing Indices")
 
 metric_map = {
     "Climate Commitment Intensity Index (CCII)": "ccii",
@@ -208,50 +242,69 @@ metric_map = {
     "Greenwashing Index (GWGHG)": "gwghg"
 }
 
-metric_label = st.selectbox(
-    "Select Index:",
-    list(metric_map.keys())
-)
+@st.cache_resource(max_entries=2)
+def load_rank_table(version):
+    return data_store.freeze(
+        rankings.build_rank_table(load_data(version), metrics=list(metric_map.values()))
+    )
 
-metric = metric_map[metric_label]
+# 只保留每年都有数据的国家后重新排名（按数据版本和指标缓存）
+@st.cache_resource(max_entries=6)
+def load_complete_rank_table(version, metric):
+    return data_store.freeze(rankings.build_complete_rank_table(
+        load_data(version), load_country_coverage(version), metric
+    ))
+
+@st.fragment
+def top_countries_section():
+    version = data_watcher.version("country")
+    rank_table = None if static_assets is not None else load_rank_table(version)
+
+    metric_label = st.selectbox(
+        "Select Index:",
+        list(metric_map.keys())
+    )
 
-df_rank = df.copy()
+    metric = metric_map[metric_label]
 
-df_rank["rank"] = (
-    df_rank
-    .groupby("year")[metric]
-    .rank(method="first", ascending=False)
-)
+    top_n = st.slider(
+        "Number of Countries:",
+        min_value=min(export_static.TOP_N),
+        max_value=max(export_static.TOP_N),
+        value=10,
+        key="top_n"
+    )
 
-df_rank = df_rank[df_rank["rank"] <= 10]
-df_rank = df_rank.sort_values(["country", "year"])
+    complete_only = st.checkbox(
+        "Only countries with data in every year",
+        key="top_complete_only",
+        help="Countries with gaps can drop out of the ranking simply because "
+             "a year is missing."
+    )
+    if static_assets is not None:
+        countries = (export_static.COMPLETE_COUNTRIES if complete_only
+                     else export_static.ALL_COUNTRIES)
+        show_static_asset(("bump", metric, top_n, countries))
+    else:
+        if complete_only:
+            rank_table = load_complete_rank_table(version, metric)
 
-fig_bump = px.line(
-    df_rank,
-    x="year",
-    y="rank",
-    color="country",
-    markers=True,
-    title=f"Top 10 Countries by {metric_label} Over Time"
-)
+        df_rank = rankings.top_n(rank_table, metric, top_n)
 
-fig_bump.update_yaxes(
-    autorange="reversed",
-    title="Rank (1 = Highest)"
-)
+        fig_bump = figures.build_bump_chart(df_rank, metric_label, top_n)
 
-fig_bump.update_xaxes(title="Year")
+        st.plotly_chart(fig_bump, use_container_width=True)
 
-fig_bump.update_layout(
-    height=650,
-    paper_bgcolor="#0E1117",
-    plot_bgcolor="#0E1117",
-    font_color="white",
-    legend_title_text="Country",
-    margin=dict(l=40, r=40, t=60, b=40)
-)
+    # 每年有该指标数据的国家数
+    country_coverage = load_country_coverage(version)
+    per_year = (country_coverage[country_coverage[metric] > 0]
+                .groupby("year", observed=True)["country"].nunique())
+    total = country_coverage["country"].nunique()
+    st.caption("Countries with data: " + ", ".join(
+        f"{year}: {n}/{total}" for year, n in per_year.items()
+    ))
 
-st.plotly_chart(fig_bump, use_container_width=True)
+top_countries_section()
 
 st.markdown(f"""
 Hover over the colored block to view the specific parameters.
@@ -261,97 +314,155 @@ Hover over the colored block to view the specific parameters.
 # 行业层面漂绿 vs 承诺分析（带四象限标注和文字说明）
 # =========================
 
-@st.cache_data
-def load_industry_data():
-    df_ind = pd.read_csv("industrylevel.csv")
-    df_ind["year"] = df_ind["year"].astype(int)
-    return df_ind
+@st.cache_resource(max_entries=2)
+def load_industry_data(version):
+    return data_store.freeze(data_store.load_dataset("industry", version))
 
-df_ind = load_industry_data()
-
-st.markdown("---")
-st.subheader("🏭 Industry-level Climate Commitment vs Greenwashing")
-
-# =========================
-# 选择漂绿指标
-# =========================
-color_metric_map = {
-    "Greenwashing Index (GWE)": "gwe",
-    "Greenwashing Index (GWGHG)": "gwghg"
-}
-color_label = st.selectbox(
-    "Select Greenwashing Measure for Y-axis:",
-    list(color_metric_map.keys()),
-    key="industry_scatter_quadrant"
-)
-y_metric = color_metric_map[color_label]
+@st.cache_resource(max_entries=2)
+def load_industry_stats(version):
+    # 每个指标、每年的均值/中位数/分位数等，四象限分界与标注位置都从这里取
+    return data_store.freeze(
+        stats_table.build_stats_table(load_industry_data(version), ["ccii", "gwe", "gwghg"])
+    )
 
-# =========================
-# 绘制动画散点图
-# =========================
-fig = px.scatter(
-    df_ind,
-    x="ccii",
-    y=y_metric,
-    color=y_metric,
-    text="industry",
-    animation_frame="year",
-    color_continuous_scale="RdYlGn_r",
-    title=f"Industry CCII vs {color_label} (Animated)"
-)
+@st.cache_resource(max_entries=12)
+def load_quadrant_transitions(version, y_metric, split):
+    wide = quadrants.quadrant_table(load_industry_data(version), y_metric,
+                                    stats=load_industry_stats(version), split=split)
+    pairs, counts = quadrants.transition_counts(wide)
+    return data_store.freeze(wide), pairs, counts
 
-fig.update_traces(
-    textposition="top center",
-    marker=dict(size=14, line=dict(width=1, color="white"))
-)
+@st.cache_resource(max_entries=2)
+def load_firm_query(version):
+    return firm_query.open_firm_query(version)
 
-# =========================
-# 添加中心十字线
-# =========================
-x_center = 0  # CCII 基准
-y_center = df_ind[y_metric].mean()  # 漂绿均值
+st.markdown("---")
+st.subheader("🏭 Industry-level Climate Commitment vs Greenwashing")
 
-fig.add_shape(type="line", x0=x_center, x1=x_center,
-              y0=df_ind[y_metric].min(), y1=df_ind[y_metric].max(),
-              line=dict(color="white", dash="dash"))
-fig.add_shape(type="line", x0=df_ind["ccii"].min(), x1=df_ind["ccii"].max(),
-              y0=y_center, y1=y_center,
-              line=dict(color="white", dash="dash"))
+@st.fragment
+def industry_section():
+    industry_version = data_watcher.version("industry")
+    df_ind = load_industry_data(industry_version)
+
+    # =========================
+    # 选择漂绿指标
+    # =========================
+    color_metric_map = {
+        "Greenwashing Index (GWE)": "gwe",
+        "Greenwashing Index (GWGHG)": "gwghg"
+    }
+    color_label = st.selectbox(
+        "Select Greenwashing Measure for Y-axis:",
+        list(color_metric_map.keys()),
+        key="industry_scatter_quadrant"
+    )
+    y_metric = color_metric_map[color_label]
 
-# =========================
-# 四象限标注文字
-# =========================
-annotations = [
-    dict(x=df_ind["ccii"].max()*0.6, y=df_ind[y_metric].max()*0.9,
-         text="High CCII<br>High Greenwashing<br>(Symbolic Commitment)",
-         showarrow=False, font=dict(color="white", size=12), align="center"),
-    dict(x=df_ind["ccii"].min()*0.6, y=df_ind[y_metric].max()*0.9,
-         text="Low CCII<br>High Greenwashing<br>(Formalist / Passive)",
-         showarrow=False, font=dict(color="white", size=12), align="center"),
-    dict(x=df_ind["ccii"].min()*0.6, y=df_ind[y_metric].min()*0.9,
-         text="Low CCII<br>Low Greenwashing<br>(Low-risk Industry)",
-         showarrow=False, font=dict(color="white", size=12), align="center"),
-    dict(x=df_ind["ccii"].max()*0.6, y=df_ind[y_metric].min()*0.9,
-         text="High CCII<br>Low Greenwashing<br>(Substantive Commitment)",
-         showarrow=False, font=dict(color="white", size=12), align="center"),
-]
-fig.update_layout(annotations=annotations)
+    level = st.radio(
+        "Level:",
+        ("Industries", "Firms", "Firms (density)"),
+        horizontal=True,
+        key="industry_level"
+    )
 
-# =========================
-# 图布局
-# =========================
-fig.update_layout(
-    height=650,
-    paper_bgcolor="#0E1117",
-    plot_bgcolor="#0E1117",
-    font_color="white",
-    xaxis_title="Climate Commitment Intensity Index (CCII)",
-    yaxis_title=color_label,
-    margin=dict(l=40, r=40, t=60, b=40),
-    coloraxis_colorbar=dict(title=color_label)
-)
+    # =========================
+    # 企业密度图：服务端按年二维分箱，数据量只取决于格子数
+    # =========================
+    if level == "Firms (density)":
+        version = data_watcher.version("firm")
+        engine = load_firm_query(version)
+        bins = st.select_slider(
+            "Bins per axis:",
+            options=export_static.DENSITY_BINS,
+            value=40,
+            key="firm_density_bins"
+        )
+        if static_assets is not None:
+            show_static_asset(("firm_density", y_metric, bins))
+            return
+        fig = figures.firm_density(engine, y_metric, color_label, bins, version)
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    # =========================
+    # 企业层面：每年数万个点，用 WebGL 绘制，名称只在悬停或框选时显示
+    # =========================
+    if level == "Firms":
+        version = data_watcher.version("firm")
+        engine = load_firm_query(version)
+        year = st.selectbox("Select Year", engine.years, key="firm_quadrant_year")
+        if static_assets is not None:
+            show_static_asset(("firm_quadrant", y_metric, int(year)))
+            st.caption("Hover over a point to see the firm's country and industry.")
+            return
+        fig = figures.firm_quadrant(engine, y_metric, color_label, year, version)
+
+        # 图表 key 随年份和指标变化，选中的点编号始终对应当前这张图
+        chart_key = f"firm_quadrant_{y_metric}_{year}"
+        selection = st.session_state.get(chart_key)
+        selected = selection["selection"]["points"] if selection else []
+        if selected:
+            indices = [p["point_index"] for p in selected if p.get("curve_number", 0) == 0]
+            points = figures.firm_points(engine, y_metric, year)
+            fig = figures.label_points(fig, points, indices, y_metric)
+
+        st.plotly_chart(
+            fig,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode=("points", "box", "lasso"),
+            key=chart_key
+        )
+        st.caption("Hover over a point to see the firm's country and industry; "
+                   "select points (click, box or lasso) to label them.")
+        return
+
+    split = st.radio(
+        "Quadrant Split:",
+        tuple(quadrants.SPLITS),
+        horizontal=True,
+        key="industry_quadrant_split",
+        help="Where the horizontal line sits: the mean over all years, "
+             "or each year's own mean or median."
+    )
 
-st.plotly_chart(fig, use_container_width=True)
+    # =========================
+    # 绘制动画散点图（带四象限）
+    # =========================
+    if static_assets is not None:
+        show_static_asset(("industry", y_metric, split, "animated"))
+    else:
+        fig = figures.industry_quadrant(df_ind, y_metric, color_label,
+                                        load_industry_stats(industry_version),
+                                        split, industry_version)
+        st.plotly_chart(fig, use_container_width=True)
+
+    # =========================
+    # 象限转移：哪些行业换了象限（按数据版本和指标缓存）
+    # =========================
+    with st.expander("Which industries moved quadrant?"):
+        wide, pairs, counts = load_quadrant_transitions(industry_version, y_metric, split)
+        pair_labels = [f"{a} → {b}" for a, b in pairs]
+        pair_label = st.selectbox(
+            "Years:",
+            pair_labels,
+            index=len(pair_labels) - 1,
+            key="quadrant_transition_years"
+        )
+        i = pair_labels.index(pair_label)
+        year_from, year_to = pairs[i]
+        if static_assets is not None:
+            show_static_asset(("sankey", y_metric, split, year_from, year_to), height=480)
+        else:
+            matrix = quadrants.transition_matrix(counts, i)
+            st.plotly_chart(
+                figures.build_quadrant_sankey(matrix, year_from, year_to, color_label),
+                use_container_width=True
+            )
+        st.dataframe(quadrants.movers(wide, year_from, year_to),
+                     hide_index=True, use_container_width=True)
+
+industry_section()
 
 # =========================
 # 图下方文字说明
@@ -368,39 +479,84 @@ Use the animation to see how industries move across quadrants over years.
 """)
 
 
+# =========================
+# 大洲层面：来自预计算的聚合立方体（cube.py），不在重跑时对企业数据做 groupby
+# =========================
+st.markdown("---")
+st.subheader("🌐 Continent-level Climate Commitment and Greenwashing")
+
+@st.cache_resource(max_entries=2)
+def load_continent_view(version):
+    by_year, by_country = cube.continent_view(cube.open_cube(version))
+    return data_store.freeze(by_year), data_store.freeze(by_country)
+
+@st.fragment
+def continent_section():
+    version = data_watcher.version("firm")
+    by_year, by_country = load_continent_view(version)
+
+    indicator = st.radio(
+        "Select Indicator:",
+        tuple(figures.INDICATOR_CONFIG),
+        horizontal=True,
+        key="continent_indicator"
+    )
+    year = st.select_slider(
+        "Select Year",
+        options=sorted(by_year["year"].unique()),
+        value=by_year["year"].max(),
+        key="continent_year"
+    )
+
+    if static_assets is not None:
+        show_static_asset(("continent_map", indicator, int(year)))
+        show_static_asset(("continent_lines", indicator), height=580)
+        return
+
+    fig_map = figures.continent_choropleth(by_country, indicator, year, version)
+    st.plotly_chart(fig_map, use_container_width=True)
+
+    fig_lines = figures.continent_lines(by_year, indicator, version)
+    st.plotly_chart(fig_lines, use_container_width=True)
+
+continent_section()
+
+st.markdown(f"""
+Each country is shaded by the average across all firms in its continent, so this view compares continents rather than individual countries.  
+Hover over the map or the lines to see the number of firms behind each average.
+""")
+
+
 st.markdown("---")
 
 # =========================
 # 计数器
 # =========================
-COUNTER_FILE = "like_counter.txt"
+@st.cache_resource
+def get_counter_store():
+    return like_counter.WriteBehindCounter(like_counter.CounterStore())
 
-def load_counter():
-    with open(COUNTER_FILE, "r") as f:
-        like, really_like = f.read().strip().split(",")
-    return int(like), int(really_like)
-
-def save_counter(like, really_like):
-    with open(COUNTER_FILE, "w") as f:
-        f.write(f"{like},{really_like}")
+counter_store = get_counter_store()
 
 st.subheader("Do you like these maps? ⭐")
 
-like_count, really_like_count = load_counter()
+@st.fragment
+def like_counter_section():
+    counts = counter_store.read()
+
+    col1, col2 = st.columns(2)
 
-col1, col2 = st.columns(2)
+    with col1:
+        if st.button("⭐ Like"):
+            counts["like"] = counter_store.increment("like")
+        st.write(f"Likes: {counts['like']}")
 
-with col1:
-    if st.button("⭐ Like"):
-        like_count += 1
-        save_counter(like_count, really_like_count)
-    st.write(f"Likes: {like_count}")
+    with col2:
+        if st.button("⭐⭐ Really Like"):
+            counts["really_like"] = counter_store.increment("really_like")
+        st.write(f"Really Likes: {counts['really_like']}")
 
-with col2:
-    if st.button("⭐⭐ Really Like"):
-        really_like_count += 1
-        save_counter(like_count, really_like_count)
-    st.write(f"Really Likes: {really_like_count}")
+like_counter_section()
 
 st.markdown("---")
 
@@ -0,0 +1,274 @@
+"""Headless benchmarks for the dashboard's data and figure pipeline.
+
+Runs every stage of app.py without Streamlit, against the shipped CSVs and
+against synthetically scaled copies, and appends the results to
+``.benchmarks/results.jsonl`` so runs can be compared across commits.
+
+    python benchmark.py                     # 1x, 10x and 100x entities
+    python benchmark.py --scales 1,10 --axis years
+    python benchmark.py --compare           # latest run vs previous commit
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import data_store
+import figures
+import rankings
+from firm_query import FirmQuery
+
+
+RESULTS_DIR = os.path.join(data_store.BASE_DIR, ".benchmarks")
+RESULTS_FILE = os.path.join(RESULTS_DIR, "results.jsonl")
+
+
+# =========================
+# 合成放大数据
+# =========================
+def scale_frame(df, factor, entity, axis="entities", seed=0):
+    """Replicate ``df`` ``factor`` times along entities or years.
+
+    Entity copies get a ``~k`` suffix (keeping their ISO-3 code, so they
+    still land on the map); year copies are shifted past the last year.
+    Measures get a little noise so copies do not tie in rankings.
+    """
+    if factor <= 1:
+        return df.copy()
+    rng = np.random.default_rng(seed)
+    measures = [c for c in df.columns if c in ("enscore", "enero91v", "ccii", "gwe", "gwghg")]
+    span = int(df["year"].max() - df["year"].min() + 1)
+    parts = []
+    for k in range(factor):
+        part = df.copy()
+        if k:
+            if axis == "years":
+                part["year"] = part["year"] + k * span
+            elif entity is not None:
+                part[entity] = part[entity].astype(str) + f"~{k}"
+            noise = rng.normal(0, 0.01, size=(len(part), len(measures)))
+            part[measures] = part[measures].to_numpy() + noise
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+# =========================
+# 计时与内存
+# =========================
+def measure(fn, repeat=3):
+    """Median wall time over ``repeat`` untraced runs, plus one traced run
+    for peak Python heap and Arrow memory (tracemalloc slows timing down)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    traced = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    arrow_held = pa.total_allocated_bytes() - arrow_before
+    del traced
+    return result, {
+        "wall_s": statistics.median(times),
+        "wall_min_s": min(times),
+        "peak_mem_mb": (peak + max(arrow_held, 0)) / 2**20,
+    }
+
+
+def payload_bytes(fig):
+    return len(fig.to_json().encode("utf-8"))
+
+
+def read_arrow(path):
+    return ipc.open_file(pa.memory_map(path, "r")).read_all().to_pandas()
+
+
+# =========================
+# 各阶段
+# =========================
+def run_stages(country, industry, firm, repeat=3):
+    results = {}
+    year = int(country["year"].min())
+
+    def record(name, fn, figure=False):
+        out, stats = measure(fn, repeat)
+        if figure:
+            _, ser = measure(out.to_json, repeat)
+            stats["serialize_s"] = ser["wall_s"]
+            stats["payload_bytes"] = payload_bytes(out)
+        results[name] = stats
+        return out
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, frame in (("country", country), ("industry", industry), ("firm", firm)):
+            src = os.path.join(tmp, f"{name}.csv")
+            dst = os.path.join(tmp, f"{name}.arrow")
+            frame.to_csv(src, index=False)
+            data_store.write_arrow(pa.Table.from_pandas(frame, preserve_index=False), dst)
+            record(f"load_csv.{name}", lambda: pd.read_csv(src))
+            record(f"load_arrow.{name}", lambda: read_arrow(dst))
+
+    table = record("rank_table", lambda: rankings.build_rank_table(country))
+    record("rank_top_n", lambda: rankings.top_n(table, "ccii", 10))
+
+    for indicator in figures.INDICATOR_CONFIG:
+        record(f"choropleth.single.{indicator}",
+               lambda: figures.build_choropleth(country, indicator, figures.SINGLE_YEAR, year),
+               figure=True)
+        record(f"choropleth.animated.{indicator}",
+               lambda: figures.build_choropleth(country, indicator, figures.ANIMATED),
+               figure=True)
+
+    df_rank = rankings.top_n(table, "ccii", 10)
+    record("bump_chart", lambda: figures.build_bump_chart(df_rank, "CCII", 10), figure=True)
+
+    for y_metric in ("gwe", "gwghg"):
+        record(f"industry_quadrant.{y_metric}",
+               lambda: figures.build_industry_quadrant(industry, y_metric, y_metric.upper()),
+               figure=True)
+
+    engine = FirmQuery(pa.Table.from_pandas(
+        firm.sort_values(data_store.SORT_KEYS["firm"], ignore_index=True),
+        preserve_index=False,
+    ))
+    record("firm_query.continent_year",
+           lambda: engine.aggregate(["continent", "year"], stats=("mean", "count")))
+    record("firm_query.filtered",
+           lambda: engine.aggregate(["industry"], year=year, continent="europe"))
+    record("firm_quadrant.gwe",
+           lambda: figures.build_firm_quadrant(
+               figures.firm_points(engine, "gwe", year), "gwe", "GWE", year,
+               {m: engine.extent(m) for m in ("ccii", "gwe")}),
+           figure=True)
+    record("firm_density.gwe",
+           lambda: figures.build_firm_density(
+               figures.bin_firms(engine, "gwe"), "gwe", "GWE",
+               {m: engine.extent(m) for m in ("ccii", "gwe")}),
+           figure=True)
+    return results
+
+
+# =========================
+# 结果存储与比较
+# =========================
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=data_store.BASE_DIR, stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(records):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(RESULTS_FILE, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_results():
+    try:
+        with open(RESULTS_FILE) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def compare(threshold=0.2):
+    """Print latest vs previous-commit timings; flag slowdowns > threshold."""
+    records = load_results()
+    if not records:
+        print("no benchmark results yet")
+        return 0
+    latest = records[-1]["commit"]
+    previous = next((r["commit"] for r in reversed(records) if r["commit"] != latest), None)
+    if previous is None:
+        print(f"only one commit recorded ({latest})")
+        return 0
+
+    def index(commit):
+        return {(r["scale"], r["axis"], r["stage"]): r for r in records if r["commit"] == commit}
+
+    new, old = index(latest), index(previous)
+    regressions = 0
+    print(f"{'stage':45s} {'scale':>6s} {previous:>10s} {latest:>10s} {'change':>8s}")
+    for key in sorted(new.keys() & old.keys()):
+        scale, axis, stage = key
+        a, b = old[key]["wall_s"], new[key]["wall_s"]
+        change = (b - a) / a if a else 0.0
+        flag = "  <-- slower" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"{stage:45s} {scale:>5d}x {a * 1e3:9.1f}ms {b * 1e3:9.1f}ms "
+              f"{change:+7.0%}{flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100",
+                        help="comma-separated scale factors (default: 1,10,100)")
+    parser.add_argument("--axis", choices=("entities", "years"), default="entities",
+                        help="scale countries/industries/firms or the year range")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare the latest commit's results with the previous one")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare()
+
+    versions = data_store.publish_all()
+    country = data_store.load_dataset("country", versions["country"])
+    industry = data_store.load_dataset("industry", versions["industry"])
+    firm = data_store.load_dataset("firm", versions["firm"])
+
+    commit = git_commit()
+    stamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    records = []
+    for scale in [int(s) for s in args.scales.split(",")]:
+        results = run_stages(
+            scale_frame(country, scale, "country", args.axis),
+            scale_frame(industry, scale, "industry", args.axis),
+            # 企业数据没有企业编号，按行复制即为“更多企业”
+            scale_frame(firm, scale, None, args.axis),
+            repeat=args.repeat,
+        )
+        print(f"\n== scale {scale}x ({args.axis}) ==")
+        print(f"{'stage':45s} {'wall':>10s} {'peak mem':>10s} {'payload':>10s}")
+        for stage, stats in results.items():
+            payload = stats.get("payload_bytes")
+            payload = f"{payload / 1024:8.0f}KB" if payload is not None else ""
+            print(f"{stage:45s} {stats['wall_s'] * 1e3:8.1f}ms "
+                  f"{stats['peak_mem_mb']:8.1f}MB {payload:>10s}")
+            records.append({
+                "commit": commit, "timestamp": stamp, "python": platform.python_version(),
+                "scale": scale, "axis": args.axis, "stage": stage, **stats,
+            })
+
+    if not args.no_save:
+        save_results(records)
+        print(f"\nresults appended to {os.path.relpath(RESULTS_FILE)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import sys
+
+import pandas as pd
+
+
+# =========================
+# 国家名 -> ISO-3 代码
+# =========================
+# 键为数据集中使用的小写国家名；新增国家时在此补充
+ISO3 = {
+    "argentina": "ARG",
+    "australia": "AUS",
+    "austria": "AUT",
+    "belgium": "BEL",
+    "bermuda": "BMU",
+    "brazil": "BRA",
+    "cambodia": "KHM",
+    "canada": "CAN",
+    "cayman islands": "CYM",
+    "chile": "CHL",
+    "china": "CHN",
+    "colombia": "COL",
+    "czechia": "CZE",
+    "denmark": "DNK",
+    "ecuador": "ECU",
+    "egypt": "EGY",
+    "estonia": "EST",
+    "finland": "FIN",
+    "france": "FRA",
+    "germany": "DEU",
+    "greece": "GRC",
+    "guernsey": "GGY",
+    "hong kong": "HKG",
+    "hungary": "HUN",
+    "iceland": "ISL",
+    "india": "IND",
+    "indonesia": "IDN",
+    "ireland": "IRL",
+    "israel": "ISR",
+    "italy": "ITA",
+    "japan": "JPN",
+    "jersey": "JEY",
+    "kazakhstan": "KAZ",
+    "kuwait": "KWT",
+    "lithuania": "LTU",
+    "luxembourg": "LUX",
+    "malaysia": "MYS",
+    "malta": "MLT",
+    "marshall islands": "MHL",
+    "mexico": "MEX",
+    "mongolia": "MNG",
+    "netherlands": "NLD",
+    "new zealand": "NZL",
+    "nigeria": "NGA",
+    "norway": "NOR",
+    "panama": "PAN",
+    "peru": "PER",
+    "philippines": "PHL",
+    "poland": "POL",
+    "portugal": "PRT",
+    "qatar": "QAT",
+    "russia": "RUS",
+    "saudi arabia": "SAU",
+    "singapore": "SGP",
+    "slovenia": "SVN",
+    "south africa": "ZAF",
+    "south korea": "KOR",
+    "spain": "ESP",
+    "sweden": "SWE",
+    "switzerland": "CHE",
+    "taiwan": "TWN",
+    "thailand": "THA",
+    "turkey": "TUR",
+    "uk": "GBR",
+    "ukraine": "UKR",
+    "united arab emirates": "ARE",
+    "usa": "USA",
+}
+
+# 常见别名
+ALIASES = {
+    "czech republic": "czechia",
+    "korea": "south korea",
+    "republic of korea": "south korea",
+    "russian federation": "russia",
+    "turkiye": "turkey",
+    "uae": "united arab emirates",
+    "united kingdom": "uk",
+    "united states": "usa",
+    "united states of america": "usa",
+}
+
+
+def normalise(name):
+    name = " ".join(str(name).strip().lower().split())
+    return ALIASES.get(name, name)
+
+
+def to_iso3(countries):
+    """Map a Series of country names to ISO-3 codes (missing -> <NA>)."""
+    names = pd.Series(countries.unique())
+    lookup = dict(zip(names, names.map(normalise).map(ISO3)))
+    return countries.map(lookup).astype("string")
+
+
+def unmatched(countries):
+    return sorted(
+        name for name in pd.Series(countries).dropna().unique()
+        if normalise(name) not in ISO3
+    )
+
+
+if __name__ == "__main__":
+    import data_store
+
+    missing = False
+    for name in data_store.DATASETS:
+        df = data_store.parse_csv(name)
+        if "country" not in df.columns:
+            continue
+        names = unmatched(df["country"])
+        missing = missing or bool(names)
+        status = ", ".join(names) if names else "all matched"
+        print(f"{name:10s} {status}")
+    sys.exit(1 if missing else 0)
@@ -0,0 +1,224 @@
+import hashlib
+import itertools
+import os
+import re
+import shutil
+import sys
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import country_codes
+import data_store
+from firm_query import MEASURES
+
+
+# =========================
+# 预计算聚合立方体（year × continent × country × industry）
+# =========================
+DIMENSIONS = ("year", "continent", "country", "industry")
+STATS = ("mean", "median", "count", "std")
+# 每个企业数据版本一个文件：cube.<版本>.arrow
+CUBE_FILE = os.path.join(data_store.CACHE_DIR, "cube.arrow")
+
+# 所有维度组合（包括全部汇总的空组合）
+GROUPING_SETS = [
+    dims
+    for r in range(len(DIMENSIONS) + 1)
+    for dims in itertools.combinations(DIMENSIONS, r)
+]
+
+
+def grouping_key(dims):
+    ordered = [d for d in DIMENSIONS if d in dims]
+    return "|".join(ordered) or "all"
+
+
+def _aggregate(df, dims):
+    dims = list(dims)
+    keys = dims or [pd.Series(0, index=df.index, name="_all")]
+    out = df.groupby(keys, observed=True, sort=True)[list(MEASURES)].agg(list(STATS))
+    out.columns = [f"{m}_{s}" for m, s in out.columns]
+    out = out.reset_index()
+    if not dims:
+        out = out.drop(columns="_all")
+    for d in DIMENSIONS:
+        if d not in dims:
+            out[d] = None
+    out.insert(0, "grouping", grouping_key(dims))
+    return out
+
+
+def year_hashes(df):
+    """Content hash per year, used to find which years need rebuilding."""
+    return {
+        int(year): hashlib.sha256(
+            pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes()
+        ).hexdigest()
+        for year, part in df.groupby("year", sort=True)
+    }
+
+
+def _finalise(frame):
+    frame = frame.astype({"year": "Int64"})
+    for d in DIMENSIONS[1:]:
+        frame[d] = frame[d].astype("string")
+    for col in frame.columns:
+        if col.endswith("_count"):
+            frame[col] = frame[col].astype("int64")
+    return frame[["grouping", *DIMENSIONS] + [c for c in frame.columns
+                                              if c not in ("grouping", *DIMENSIONS)]]
+
+
+def cube_path(version):
+    stem, ext = os.path.splitext(CUBE_FILE)
+    return f"{stem}.{version}{ext}"
+
+
+def read_cube_frame(version):
+    source = pa.memory_map(cube_path(version), "r")
+    return ipc.open_file(source).read_all().to_pandas()
+
+
+# 立方体构建串行执行；与导入和会话重跑无关，不取 data_store.ingest_lock
+_build_lock = threading.Lock()
+
+
+def build_cube(version, force=False):
+    """Build or incrementally refresh the cube for firm data ``version``.
+
+    Grouping sets that contain ``year`` are stored per year, so only years
+    whose rows changed (or were appended) since the previous build are
+    recomputed. Sets that roll years up are recomputed in full because
+    medians are not additive. Returns the list of years that were rebuilt.
+    Each version gets its own file, so readers of an older version are not
+    affected by a build; the current and the previous file are kept.
+    """
+    with _build_lock:
+        return _build_cube(version, force)
+
+
+def _build_cube(version, force):
+    path = cube_path(version)
+    if not force and os.path.exists(path):
+        return []
+
+    entry = data_store.load_manifest().get("cube", {})
+    previous = entry.get("firm_version")
+    firm = data_store.load_dataset("firm", version)
+    hashes = year_hashes(firm)
+    old_hashes = {int(y): h for y, h in entry.get("years", {}).items()}
+
+    if force or previous is None or not os.path.exists(cube_path(previous)):
+        changed = set(hashes)
+        kept = None
+    else:
+        changed = {y for y, h in hashes.items() if old_hashes.get(y) != h}
+        removed = set(old_hashes) - set(hashes)
+        if not changed and not removed:
+            # 各年内容都没变：沿用上一版本的立方体
+            data_store.replace_file(path, lambda tmp: shutil.copyfile(cube_path(previous), tmp))
+            _finish(version, previous, entry)
+            return []
+        old = read_cube_frame(previous)
+        with_year = old["grouping"].str.contains("year", regex=False)
+        stale = old["year"].isin(changed | removed)
+        kept = old[with_year & ~stale]
+
+    parts = [] if kept is None else [kept]
+    fresh = firm[firm["year"].isin(changed)]
+    for dims in GROUPING_SETS:
+        if "year" in dims:
+            if not fresh.empty:
+                parts.append(_aggregate(fresh, dims))
+        else:
+            parts.append(_aggregate(firm, dims))
+
+    frame = _finalise(pd.concat(parts, ignore_index=True))
+    frame = frame.sort_values(["grouping", *DIMENSIONS], ignore_index=True)
+    data_store.write_arrow(pa.Table.from_pandas(frame, preserve_index=False), path)
+    _finish(version, previous, {
+        "source": data_store.DATASETS["firm"],
+        "years": {str(y): h for y, h in hashes.items()},
+        "rows": len(frame),
+    })
+    return sorted(changed)
+
+
+def _finish(version, previous, entry):
+    # 只在写清单的一瞬间持有清单锁
+    data_store.update_manifest("cube", dict(entry, firm_version=version))
+    folder, filename = os.path.split(CUBE_FILE)
+    stem, ext = os.path.splitext(filename)
+    pattern = re.compile(rf"^{re.escape(stem)}\.([0-9a-f]{{12}}){re.escape(ext)}$")
+    for filename in os.listdir(folder):
+        match = pattern.match(filename)
+        if match and match.group(1) not in (version, previous):
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                pass
+
+
+class Cube:
+    """Lookup-only access to the precomputed cube.
+
+    ``cube.slice(("continent", "year"))`` returns the continent-by-year
+    aggregates without touching the firm rows.
+    """
+
+    def __init__(self, frame):
+        self._slices = {}
+        for key, part in frame.groupby("grouping", sort=False):
+            dims = [] if key == "all" else key.split("|")
+            part = part.drop(columns=["grouping"] + [d for d in DIMENSIONS if d not in dims])
+            self._slices[key] = part.reset_index(drop=True)
+
+    def slice(self, by=(), metrics=None, stats=None, **filters):
+        by = [by] if isinstance(by, str) else list(by)
+        frame = self._slices[grouping_key(by)]
+        for dim, value in filters.items():
+            if value is None:
+                continue
+            if dim not in by:
+                raise ValueError(f"Filter on '{dim}' requires it in the slice dimensions")
+            if isinstance(value, (list, tuple, set, range)):
+                frame = frame[frame[dim].isin(list(value))]
+            else:
+                frame = frame[frame[dim] == value]
+        if metrics is not None or stats is not None:
+            metrics = MEASURES if metrics is None else metrics
+            stats = STATS if stats is None else stats
+            frame = frame[[d for d in DIMENSIONS if d in by]
+                          + [f"{m}_{s}" for m in metrics for s in stats]]
+        return frame.reset_index(drop=True)
+
+
+def open_cube(version):
+    """The cube for firm data ``version``; built first only if it does not exist yet."""
+    if not os.path.exists(cube_path(version)):
+        build_cube(version)
+    return Cube(read_cube_frame(version))
+
+
+def continent_view(cube, stats=("mean", "count")):
+    """Continent-by-year aggregates, and the same rows spread over member countries.
+
+    The second frame has one row per (country, year) carrying its
+    continent's values plus ``iso3``, ready for a choropleth.
+    """
+    by_year = cube.slice(("continent", "year"), stats=stats)
+    members = cube.slice(("continent", "country"), metrics=(), stats=())
+    members["iso3"] = country_codes.to_iso3(members["country"])
+    by_country = members.merge(by_year, on="continent", how="inner")
+    return by_year, by_country.sort_values(["year", "continent", "country"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    rebuilt = build_cube(data_store.publish("firm"), force="--force" in sys.argv)
+    if rebuilt:
+        print(f"cube rebuilt for years: {', '.join(map(str, rebuilt))}")
+    else:
+        print("cube up to date")
@@ -0,0 +1,56 @@
+"""Per-year data coverage, built once at ingest (see data_store.ingest).
+
+Plotly silently drops missing values, so a country without data looks
+the same as one that is simply not in the dataset. The coverage table
+records, for every year and entity, how many rows there are and how many
+of them have each measure.
+
+    python data_coverage.py country ccii     # entities missing ccii, per year
+"""
+import sys
+
+import pandas as pd
+
+
+def build_coverage(df, keys, measures):
+    """Row count and non-null count of each measure per (year, *keys)."""
+    keys = ["year", *keys]
+    present = df[list(measures)].notna()
+    for key in keys:
+        present[key] = df[key]
+    grouped = present.groupby(keys, observed=True, sort=True)
+    table = grouped[list(measures)].sum()
+    table.insert(0, "rows", grouped.size())
+    # 计数用最小的无符号整数类型保存
+    return table.apply(pd.to_numeric, downcast="unsigned").reset_index()
+
+
+def covered(coverage, column, year, entity):
+    """Entities with at least one value of ``column`` in ``year``."""
+    rows = coverage[(coverage["year"] == year) & (coverage[column] > 0)]
+    return set(rows[entity].astype(str))
+
+
+def missing(coverage, column, year, entity):
+    """Entities present in the dataset that have no ``column`` value in ``year``."""
+    return sorted(set(coverage[entity].astype(str)) - covered(coverage, column, year, entity))
+
+
+def years_with_data(coverage, column, entity):
+    """Number of years with at least one ``column`` value, per entity."""
+    has_data = coverage[coverage[column] > 0]
+    counts = has_data.groupby(has_data[entity].astype(str))["year"].nunique()
+    return counts.reindex(sorted(set(coverage[entity].astype(str))), fill_value=0)
+
+
+if __name__ == "__main__":
+    import data_store
+
+    name = sys.argv[1] if len(sys.argv) > 1 else "country"
+    column = sys.argv[2] if len(sys.argv) > 2 else "ccii"
+    entity = data_store.COVERAGE_KEYS[name][0]
+    table = data_store.load_coverage(name, data_store.publish(name))
+    for year in sorted(table["year"].unique()):
+        names = missing(table, column, year, entity)
+        print(f"{year}: {len(names)} without {column}"
+              + (f" ({', '.join(names)})" if names else ""))
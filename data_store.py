@@ -0,0 +1,670 @@
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import country_codes
+import data_coverage
+
+
+# =========================
+# 路径与数据集登记
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("GW_DATA_CACHE", os.path.join(BASE_DIR, ".data_cache"))
+MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.json")
+
+
+def _default_shm_dir():
+    # 按缓存目录区分，避免同一台机器上的多个部署互相覆盖
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        tag = hashlib.sha256(CACHE_DIR.encode()).hexdigest()[:8]
+        return os.path.join("/dev/shm", f"greenwashing-index-{tag}")
+    return None
+
+
+# 共享内存目录：同一主机上的所有服务进程映射同一份 Arrow 文件；设为空字符串可关闭
+SHM_DIR = os.environ.get("GW_SHM_DIR", _default_shm_dir()) or None
+
+# 修改 parse_csv 的输出格式时加一，旧缓存会自动重建
+INGEST_VERSION = 5
+
+DATASETS = {
+    "country": "countrylevel.csv",
+    "industry": "industrylevel.csv",
+    "firm": "all data.csv",
+}
+
+# =========================
+# 数据类型约定
+# =========================
+# 指标列默认 float32；需要完整精度时设 GW_MEASURE_DTYPE=float64
+MEASURE_DTYPE = os.environ.get("GW_MEASURE_DTYPE", "float32")
+
+DIMENSION_COLUMNS = ("country", "continent", "industry", "iso3")
+MEASURE_COLUMNS = ("enscore", "enero91v", "ccii", "gwe", "gwghg")
+
+SCHEMAS = {
+    "country": ("country", "year", "enscore", "enero91v", "ccii", "gwe", "gwghg", "iso3"),
+    "industry": ("year", "industry", "enscore", "ccii", "gwe", "gwghg", "enero91v"),
+    "firm": ("year", "country", "continent", "industry",
+             "enscore", "enero91v", "ccii", "gwe", "gwghg", "iso3"),
+}
+
+
+def column_dtype(column):
+    if column == "year":
+        return "Int16"
+    if column in DIMENSION_COLUMNS:
+        return "category"
+    if column in MEASURE_COLUMNS:
+        return MEASURE_DTYPE
+    raise KeyError(column)
+
+
+def enforce_schema(name, df):
+    """Check the columns against SCHEMAS[name] and cast to the declared dtypes."""
+    expected = SCHEMAS[name]
+    missing = [c for c in expected if c not in df.columns]
+    extra = [c for c in df.columns if c not in expected]
+    if missing or extra:
+        raise ValueError(
+            f"{DATASETS[name]} does not match the '{name}' schema "
+            f"(missing: {missing or 'none'}, unexpected: {extra or 'none'})"
+        )
+    return df[list(expected)].astype({c: column_dtype(c) for c in expected})
+
+
+# 导入时按 年份 + 这些列统计每个指标的非空数量（见 data_coverage.py）
+COVERAGE_KEYS = {
+    "country": ("country",),
+    "industry": ("industry",),
+    "firm": ("country", "industry"),
+}
+
+# 按这些列排序后写入，便于按年份切片（见 firm_query.py）
+SORT_KEYS = {
+    "firm": ["year", "continent", "country", "industry"],
+}
+
+
+# =========================
+# 内容哈希
+# =========================
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _prefix_hash(f, size):
+    # 文件前 size 个字节的哈希（用于判断是否只是在末尾追加了数据）
+    h = hashlib.sha256()
+    remaining = size
+    while remaining:
+        chunk = f.read(min(1 << 20, remaining))
+        if not chunk:
+            return None
+        h.update(chunk)
+        remaining -= len(chunk)
+    return h
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def replace_file(path, write):
+    """Write ``path`` via ``write(tmp)`` on a fresh temporary file, then rename.
+
+    Every caller gets its own temporary file, so concurrent writers in any
+    thread or process never truncate a file another one has already renamed
+    into place (and possibly memory-mapped).
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                               prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        # mkstemp 只给属主读写权限，改回普通文件的权限，其它服务进程才能读
+        os.chmod(tmp, 0o644)
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    replace_file(MANIFEST_FILE, write)
+
+
+# 清单的读-改-写要串行：导入和 cube.build_cube 都会写入各自的条目
+manifest_lock = threading.Lock()
+
+
+def update_manifest(name, entry):
+    """Set ``manifest[name] = entry`` without losing other threads' updates."""
+    with manifest_lock:
+        manifest = load_manifest()
+        manifest[name] = entry
+        save_manifest(manifest)
+
+
+def csv_path(name):
+    return os.path.join(BASE_DIR, DATASETS[name])
+
+
+def arrow_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.arrow")
+
+
+def coverage_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.coverage.arrow")
+
+
+# =========================
+# CSV -> Arrow 转换
+# =========================
+def read_csv(source, names=None):
+    df = pd.read_csv(source, names=names, header=None if names else "infer")
+    if "country" in df.columns:
+        df["iso3"] = country_codes.to_iso3(df["country"])
+    return df
+
+
+def sort_rows(name, df):
+    if name in SORT_KEYS:
+        df = df.sort_values(SORT_KEYS[name], kind="stable", ignore_index=True)
+    return df
+
+
+def parse_csv(name):
+    return sort_rows(name, read_csv(csv_path(name)))
+
+
+def read_appended(name, entry):
+    """Complete lines appended to the CSV since ``entry`` was ingested.
+
+    Returns ``(data, hasher)`` where ``hasher`` covers the old file plus
+    ``data``, or None when the file was rewritten rather than appended to
+    and needs a full ingest. A partly written last line is left for the
+    next call.
+    """
+    if not entry or not os.path.exists(arrow_path(name)):
+        return None
+    if entry.get("ingest_version") != INGEST_VERSION:
+        return None
+    if entry.get("measure_dtype") != MEASURE_DTYPE:
+        return None
+    size = entry["size"]
+    path = csv_path(name)
+    if size == 0 or os.path.getsize(path) <= size:
+        return None
+    with open(path, "rb") as f:
+        h = _prefix_hash(f, size)
+        if h is None or h.hexdigest() != entry["sha256"]:
+            return None
+        f.seek(size - 1)
+        if f.read(1) != b"\n":
+            return None
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]
+    if not data.strip():
+        return None
+    h.update(data)
+    return data, h
+
+
+def memory_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+def write_arrow(table, path):
+    # 先写临时文件再替换，避免其它进程读到半个文件
+    def write(tmp):
+        with pa.OSFile(tmp, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    replace_file(path, write)
+
+
+def is_fresh(name, entry):
+    """Cheap stat check first; only hash the CSV when size or mtime moved."""
+    if not entry or not os.path.exists(arrow_path(name)):
+        return False
+    if not os.path.exists(coverage_path(name)):
+        return False
+    if entry.get("ingest_version") != INGEST_VERSION:
+        return False
+    if entry.get("measure_dtype") != MEASURE_DTYPE:
+        return False
+    st_ = os.stat(csv_path(name))
+    if entry.get("size") == st_.st_size and entry.get("mtime") == st_.st_mtime:
+        return True
+    return entry.get("sha256") == file_hash(csv_path(name))
+
+
+# 同一进程内的后台线程和命令行工具可能同时触发导入，串行执行；
+# 重跑只读取已发布的版本，从不取这把锁
+ingest_lock = threading.Lock()
+
+
+def ingest(name, force=False):
+    """Convert ``name``'s CSV to Arrow if it changed since the last ingest.
+
+    Returns False when the cache was fresh, "appended" when only new rows
+    at the end of the CSV were parsed, and "rebuilt" otherwise.
+    """
+    with ingest_lock:
+        return _ingest(name, force)
+
+
+def _read_arrow(name):
+    return ipc.open_file(pa.memory_map(arrow_path(name), "r")).read_all()
+
+
+def _ingest(name, force):
+    manifest = load_manifest()
+    entry = manifest.get(name)
+    if not force and is_fresh(name, entry):
+        return False
+
+    src = csv_path(name)
+    appended = None if force else read_appended(name, entry)
+    if appended is not None:
+        # 只解析新增的行，再与已导入的数据合并
+        data, h = appended
+        header = list(pd.read_csv(src, nrows=0).columns)
+        raw = read_csv(io.BytesIO(data), names=header)
+        previous = _read_arrow(name).to_pandas()
+        combined = pd.concat([previous, enforce_schema(name, raw)], ignore_index=True)
+        df = sort_rows(name, enforce_schema(name, combined))
+        sha256, size = h.hexdigest(), entry["size"] + len(data)
+        untyped = entry["memory_bytes_untyped"] + memory_bytes(raw)
+        status = "appended"
+    else:
+        sha256, size = file_hash(src), os.path.getsize(src)
+        raw = parse_csv(name)
+        df = enforce_schema(name, raw)
+        untyped = memory_bytes(raw)
+        status = "rebuilt"
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_arrow(table, arrow_path(name))
+    coverage_table = data_coverage.build_coverage(df, COVERAGE_KEYS[name], [
+        c for c in SCHEMAS[name] if c in MEASURE_COLUMNS
+    ])
+    write_arrow(pa.Table.from_pandas(coverage_table, preserve_index=False),
+                coverage_path(name))
+
+    updated = {
+        "source": DATASETS[name],
+        "ingest_version": INGEST_VERSION,
+        "measure_dtype": MEASURE_DTYPE,
+        "sha256": sha256,
+        "size": size,
+        "mtime": os.stat(src).st_mtime,
+        "rows": table.num_rows,
+        "arrow_sha256": file_hash(arrow_path(name)),
+        "memory_bytes": memory_bytes(df),
+        "memory_bytes_untyped": untyped,
+    }
+    if "country" in df.columns:
+        names = country_codes.unmatched(raw["country"])
+        if status == "appended":
+            names = sorted(set(names) | set(entry.get("unmatched_countries", [])))
+        updated["unmatched_countries"] = names
+        if names:
+            print(f"[{name}] no ISO-3 code for: {', '.join(names)}", file=sys.stderr)
+    update_manifest(name, updated)
+    return status
+
+
+def ingest_all(force=False):
+    return {name: ingest(name, force=force) for name in DATASETS}
+
+
+# =========================
+# 发布：按内容寻址的只读文件，读者按版本打开
+# =========================
+# 每个数据集保留的已发布版本数：当前版本和上一个，仍在用旧版本的会话还能重新读取
+KEEP_VERSIONS = 2
+PUBLISHED_SUFFIXES = {"arrow": "arrow", "coverage": "coverage.arrow", "info": "json"}
+
+
+def publish_dir():
+    return SHM_DIR or CACHE_DIR
+
+
+def published_path(name, version, kind="arrow"):
+    return os.path.join(publish_dir(), f"{name}.{version}.{PUBLISHED_SUFFIXES[kind]}")
+
+
+def publish(name):
+    """Ingest ``name`` if its CSV changed and publish the result; returns the version.
+
+    The version is a short hash of the Arrow file. Its Arrow file, coverage
+    table and manifest entry are copied under names containing the version
+    (into shared memory when SHM_DIR is set), so every process maps the same
+    files and readers never see a later ingest. Only the DataWatcher and
+    command-line entry points publish; readers open a published version.
+    Versions older than the last KEEP_VERSIONS are unlinked, which is safe
+    for processes that still have them mapped.
+    """
+    with ingest_lock:
+        _ingest(name, force=False)
+        entry = load_manifest()[name]
+        version = entry["arrow_sha256"][:12]
+        info = published_path(name, version, "info")
+        if not os.path.exists(info):
+            os.makedirs(publish_dir(), exist_ok=True)
+            for kind, source in (("arrow", arrow_path(name)), ("coverage", coverage_path(name))):
+                replace_file(published_path(name, version, kind),
+                             functools.partial(shutil.copyfile, source))
+            # 清单条目最后写：它存在即表示这个版本的文件都已就位
+            replace_file(info, lambda tmp: _write_json(tmp, entry))
+            _prune_versions(name, version)
+    return version
+
+
+def publish_all():
+    return {name: publish(name) for name in DATASETS}
+
+
+def _write_json(path, value):
+    with open(path, "w") as f:
+        json.dump(value, f, indent=2, sort_keys=True)
+
+
+def _prune_versions(name, current):
+    pattern = re.compile(rf"^{re.escape(name)}\.([0-9a-f]{{12}})\.(arrow|coverage\.arrow|json)$")
+    files = {}
+    for filename in os.listdir(publish_dir()):
+        match = pattern.match(filename)
+        if match:
+            files.setdefault(match.group(1), []).append(filename)
+    # 按发布时间（清单条目的修改时间）从新到旧保留
+    def published_at(version):
+        try:
+            return os.path.getmtime(published_path(name, version, "info"))
+        except OSError:
+            return 0
+    older = sorted((v for v in files if v != current), key=published_at, reverse=True)
+    for version in older[KEEP_VERSIONS - 1:]:
+        for filename in files[version]:
+            try:
+                os.remove(os.path.join(publish_dir(), filename))
+            except OSError:
+                pass
+
+
+# =========================
+# 读取（内存映射，零拷贝）：只打开已发布的版本，从不触发导入
+# =========================
+def read_table(name, version):
+    source = pa.memory_map(published_path(name, version), "r")
+    return ipc.open_file(source).read_all()
+
+
+def load_coverage(name, version):
+    """Per (year, entity) row and non-null counts written at ingest."""
+    source = pa.memory_map(published_path(name, version, "coverage"), "r")
+    return ipc.open_file(source).read_all().to_pandas()
+
+
+def dataset_info(name, version):
+    """The manifest entry ``name`` had when ``version`` was published."""
+    with open(published_path(name, version, "info")) as f:
+        return json.load(f)
+
+
+def unmatched_countries(name, version):
+    return dataset_info(name, version).get("unmatched_countries", [])
+
+
+def load_dataset(name, version):
+    return read_table(name, version).to_pandas()
+
+
+# =========================
+# 数据更新监测（不重启服务即可换上新数据）
+# =========================
+# 轮询间隔（秒）
+WATCH_INTERVAL = float(os.environ.get("GW_WATCH_INTERVAL", "10"))
+
+
+class DataWatcher:
+    """Poll the CSVs and re-ingest them in the background when they change.
+
+    ``version(name)`` is the data version readers should key their caches
+    on: it only moves once the new Arrow file is written and published, so
+    a refresh is picked up by the next rerun while reruns already in
+    progress finish on the data they hold. A file is re-ingested once its
+    size and mtime have stayed put for one poll, so half-written files are
+    not read. ``prepare(callback)`` registers ``callback(name, version)`` to
+    run on the watcher thread before a new version is swapped in, for data
+    derived from the dataset that readers of the new version expect to be
+    ready.
+    ``subscribe(callback)`` registers ``callback(name, version)`` to run
+    after each swap.
+    """
+
+    def __init__(self, names=tuple(DATASETS), interval=WATCH_INTERVAL):
+        self.names = tuple(names)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._seen = {}
+        self._ingested = {}
+        self._callbacks = []
+        self._preparers = []
+        self._stopped = threading.Event()
+        self._thread = None
+        for name in self.names:
+            self._ingested[name] = self._seen[name] = self._stat(name)
+            self._versions[name] = self._refresh(name)
+
+    def _stat(self, name):
+        st_ = os.stat(csv_path(name))
+        return st_.st_size, st_.st_mtime_ns
+
+    def _refresh(self, name):
+        return publish(name)
+
+    def version(self, name):
+        with self._lock:
+            return self._versions[name]
+
+    @property
+    def versions(self):
+        with self._lock:
+            return dict(self._versions)
+
+    def prepare(self, callback):
+        self._preparers.append(callback)
+        return callback
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+        return callback
+
+    def check(self):
+        """One poll; returns the datasets whose version changed."""
+        changed = []
+        for name in self.names:
+            stamp = self._stat(name)
+            settled = stamp == self._seen[name]
+            self._seen[name] = stamp
+            if not settled or stamp == self._ingested[name]:
+                continue
+            # 先记下时间戳：导入失败的文件等下次改动后再试，不会每次轮询都报错
+            self._ingested[name] = stamp
+            version = self._refresh(name)
+            if version != self.version(name):
+                # 派生数据先准备好再切换版本；失败时继续使用旧版本
+                for callback in list(self._preparers):
+                    callback(name, version)
+            with self._lock:
+                previous, self._versions[name] = self._versions[name], version
+            if version != previous:
+                changed.append(name)
+                for callback in list(self._callbacks):
+                    callback(name, version)
+        return changed
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="data-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:
+                # 新文件有问题时继续使用当前版本
+                print(f"[data-watcher] refresh failed: {exc!r}", file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+
+# =========================
+# 只读数据集（所有会话共用一份，不再逐次复制）
+# =========================
+class ReadOnlyError(TypeError):
+    pass
+
+
+def _read_only(*args, **kwargs):
+    raise ReadOnlyError(
+        "shared dataset is read-only; call .copy() to get a frame you can modify"
+    )
+
+
+class _ReadOnlyIndexer:
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    __setitem__ = _read_only
+
+
+class ReadOnlyFrame(pd.DataFrame):
+    """A DataFrame that raises ReadOnlyError on any in-place modification.
+
+    Selections, groupbys and other derived results are ordinary (mutable)
+    DataFrames, so readers can share one instance without copying it.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    insert = _read_only
+    pop = _read_only
+    update = _read_only
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat)
+
+    def __setattr__(self, name, value):
+        if name in ("index", "columns") or (
+            not name.startswith("_") and name in getattr(self, "columns", ())
+        ):
+            _read_only()
+        super().__setattr__(name, value)
+
+
+def _guard_inplace(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if kwargs.get("inplace"):
+            _read_only()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+# 所有带 inplace 参数的方法：inplace=True 时直接拒绝
+for _name, _method in inspect.getmembers(pd.DataFrame, inspect.isfunction):
+    if not _name.startswith("_") and "inplace" in inspect.signature(_method).parameters:
+        setattr(ReadOnlyFrame, _name, _guard_inplace(_method))
+
+
+def freeze(df):
+    frozen = ReadOnlyFrame(df, copy=False)
+    frozen.flags.allows_duplicate_labels = df.flags.allows_duplicate_labels
+    return frozen
+
+
+def memory_report():
+    """Per-dataset in-memory size with the declared schema vs default dtypes."""
+    ingest_all()
+    manifest = load_manifest()
+    return {
+        name: (manifest[name]["memory_bytes"], manifest[name]["memory_bytes_untyped"])
+        for name in DATASETS
+    }
+
+
+if __name__ == "__main__":
+    force = "--force" in sys.argv
+    for name, status in ingest_all(force=force).items():
+        status = status or "up to date"
+        print(f"{name:10s} {DATASETS[name]:20s} {status}")
+    for name, version in publish_all().items():
+        print(f"{name:10s} published at {published_path(name, version)}")
+    print()
+    print(f"{'dataset':10s} {'typed':>10s} {'default':>10s}  (measures: {MEASURE_DTYPE})")
+    for name, (typed, untyped) in memory_report().items():
+        print(f"{name:10s} {typed / 1024:8.0f}KB {untyped / 1024:8.0f}KB")
@@ -0,0 +1,367 @@
+"""Pre-render every chart the dashboard shows to static assets.
+
+Writes content-hashed files plus ``manifest.json`` to ``static/lite/``
+(override with ``--out`` or GW_STATIC_DIR). Standalone HTML loads
+plotly.js from the CDN; PNG/WebP images need the optional ``kaleido``
+package. The app shows these in lite mode (``?lite=1`` or GW_LITE=1)
+without running Plotly.
+
+The files are served by URL, never through the app's websocket: by
+Streamlit's static file serving (``server.enableStaticServing``, which
+serves ``static/`` at ``/app/static/``), or from a CDN when the export
+is given ``--base-url`` (or GW_STATIC_URL). Each HTML file gets a
+``.gz`` sibling for a CDN or nginx ``gzip_static``.
+
+    python export_static.py --formats html,png --workers 4
+    python export_static.py --base-url https://cdn.example.org/greenwashing
+"""
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cube
+import data_store
+import figures
+import firm_query
+import quadrants
+import rankings
+import stats_table
+
+
+# app.py 所在目录下的 static/ 由 streamlit 以 /app/static/ 提供
+STATIC_ROOT = os.path.join(data_store.BASE_DIR, "static")
+STATIC_URL = "/app/static"
+OUT_DIR = os.environ.get("GW_STATIC_DIR", os.path.join(STATIC_ROOT, "lite"))
+BASE_URL = os.environ.get("GW_STATIC_URL")
+MANIFEST_NAME = "manifest.json"
+IMAGE_FORMATS = ("png", "webp")
+# 导出文件名：<stem>.<12 位哈希>.<格式>[.gz]；清理时只删这类文件
+ASSET_PATTERN = re.compile(r"^.+\.[0-9a-f]{12}\.(html|png|webp)(\.gz)?$")
+
+RANK_METRICS = {
+    "ccii": "Climate Commitment Intensity Index (CCII)",
+    "gwe": "Greenwashing Index (GWE)",
+    "gwghg": "Greenwashing Index (GWGHG)",
+}
+INDUSTRY_METRICS = {
+    "gwe": "Greenwashing Index (GWE)",
+    "gwghg": "Greenwashing Index (GWGHG)",
+}
+# 与 app.py 中控件的取值一致：每个取值都导出一张图
+TOP_N = range(5, 21)
+DENSITY_BINS = (20, 30, 40, 60, 80)
+ALL_COUNTRIES = "all"
+COMPLETE_COUNTRIES = "complete"
+
+
+# =========================
+# 待导出的图：spec 为 (图类型, 参数...)，动画只导出 HTML
+# =========================
+def asset_jobs(formats):
+    country_years = _years(_dataset("country"))
+    industry_years = _years(_dataset("industry"))
+    image_formats = [f for f in formats if f in IMAGE_FORMATS]
+    jobs = []
+
+    def add(spec, animated=False):
+        if not animated:
+            jobs.append((spec, formats))
+        elif "html" in formats:
+            jobs.append((spec, ["html"]))
+
+    for indicator in figures.INDICATOR_CONFIG:
+        for year in country_years:
+            add(("choropleth", indicator, year))
+        add(("choropleth", indicator, "animated"), animated=True)
+    for metric in RANK_METRICS:
+        for top_n in TOP_N:
+            for countries in (ALL_COUNTRIES, COMPLETE_COUNTRIES):
+                add(("bump", metric, top_n, countries))
+    for y_metric in INDUSTRY_METRICS:
+        for split in quadrants.SPLITS:
+            for year in industry_years:
+                add(("industry", y_metric, split, year))
+            add(("industry", y_metric, split, "animated"), animated=True)
+            pairs, _ = _transitions(y_metric, split)
+            for year_from, year_to in pairs:
+                add(("sankey", y_metric, split, year_from, year_to))
+    engine = _firm_query()
+    for y_metric in INDUSTRY_METRICS:
+        for year in engine.years:
+            add(("firm_quadrant", y_metric, int(year)))
+        for bins in DENSITY_BINS:
+            add(("firm_density", y_metric, bins), animated=True)
+    by_year, _ = _continent_view()
+    for indicator in figures.INDICATOR_CONFIG:
+        for year in _years(by_year):
+            add(("continent_map", indicator, year))
+        add(("continent_lines", indicator))
+    if image_formats:
+        _require_kaleido()
+    return jobs
+
+
+def asset_key(spec):
+    return "/".join(str(part) for part in spec)
+
+
+def _years(df):
+    return [int(y) for y in sorted(df["year"].unique())]
+
+
+# 本次导出使用的数据版本（data_store.publish 的返回值）；渲染子进程启动时设置
+_versions = {}
+
+
+def _use_versions(versions):
+    _versions.clear()
+    _versions.update(versions)
+
+
+@functools.lru_cache(maxsize=None)
+def _dataset(name):
+    return data_store.load_dataset(name, _versions[name])
+
+
+@functools.lru_cache(maxsize=None)
+def _industry_stats():
+    return stats_table.build_stats_table(_dataset("industry"), ["ccii", "gwe", "gwghg"])
+
+
+@functools.lru_cache(maxsize=None)
+def _transitions(y_metric, split):
+    wide = quadrants.quadrant_table(_dataset("industry"), y_metric,
+                                    stats=_industry_stats(), split=split)
+    return quadrants.transition_counts(wide)
+
+
+@functools.lru_cache(maxsize=None)
+def _rank_table(metric, countries):
+    df = _dataset("country")
+    if countries == COMPLETE_COUNTRIES:
+        return rankings.build_complete_rank_table(df, data_store.load_coverage("country", _versions["country"]),
+                                                  metric)
+    return rankings.build_rank_table(df, metrics=[metric])
+
+
+@functools.lru_cache(maxsize=None)
+def _firm_query():
+    return firm_query.open_firm_query(_versions["firm"])
+
+
+@functools.lru_cache(maxsize=None)
+def _continent_view():
+    return cube.continent_view(cube.open_cube(_versions["firm"]))
+
+
+def build_figure(spec):
+    kind, name, *params = spec
+    if kind == "choropleth":
+        (year,) = params
+        if year == "animated":
+            return figures.build_choropleth(_dataset("country"), name, figures.ANIMATED)
+        return figures.build_choropleth(_dataset("country"), name, figures.SINGLE_YEAR, year)
+    if kind == "bump":
+        top_n, countries = params
+        df_rank = rankings.top_n(_rank_table(name, countries), name, top_n)
+        return figures.build_bump_chart(df_rank, RANK_METRICS[name], top_n)
+    if kind == "industry":
+        split, year = params
+        return figures.build_industry_quadrant(
+            _dataset("industry"), name, INDUSTRY_METRICS[name],
+            year=None if year == "animated" else year,
+            stats=_industry_stats(), split=split,
+        )
+    if kind == "sankey":
+        split, year_from, year_to = params
+        pairs, counts = _transitions(name, split)
+        matrix = quadrants.transition_matrix(counts, pairs.index((year_from, year_to)))
+        return figures.build_quadrant_sankey(matrix, year_from, year_to, INDUSTRY_METRICS[name])
+    if kind == "firm_quadrant":
+        (year,) = params
+        engine = _firm_query()
+        return figures.build_firm_quadrant(
+            figures.firm_points(engine, name, year), name, INDUSTRY_METRICS[name], year,
+            {m: engine.extent(m) for m in ("ccii", name)},
+        )
+    if kind == "firm_density":
+        (bins,) = params
+        engine = _firm_query()
+        return figures.build_firm_density(
+            figures.bin_firms(engine, name, bins), name, INDUSTRY_METRICS[name],
+            {m: engine.extent(m) for m in ("ccii", name)},
+        )
+    by_year, by_country = _continent_view()
+    if kind == "continent_map":
+        (year,) = params
+        return figures.build_continent_choropleth(by_country, name, year)
+    if kind == "continent_lines":
+        return figures.build_continent_lines(by_year, name)
+    raise ValueError(f"unknown asset kind: {kind!r}")
+
+
+def _require_kaleido():
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        raise SystemExit("PNG/WebP export needs the optional 'kaleido' package "
+                         "(pip install kaleido); use --formats html otherwise")
+
+
+# =========================
+# 渲染与写出（在子进程中运行）
+# =========================
+def _write_hashed(out_dir, stem, ext, payload):
+    digest = hashlib.sha256(payload).hexdigest()[:12]
+    filename = f"{stem}.{digest}.{ext}"
+    path = os.path.join(out_dir, filename)
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    return filename, digest
+
+
+def render(spec, formats, out_dir):
+    fig = build_figure(spec)
+    # 文件名只用小写字母、数字和连字符，URL 中无需转义
+    stem = re.sub(r"[^a-z0-9]+", "-", "-".join(str(part) for part in spec).lower())
+    entry = {}
+    for fmt in formats:
+        if fmt == "html":
+            payload = fig.to_html(include_plotlyjs="cdn", full_html=True,
+                                  div_id=stem).encode("utf-8")
+            filename, digest = _write_hashed(out_dir, stem, "html", payload)
+            gz_path = os.path.join(out_dir, filename + ".gz")
+            if not os.path.exists(gz_path):
+                with open(gz_path + ".tmp", "wb") as f:
+                    f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+                os.replace(gz_path + ".tmp", gz_path)
+            entry["html"] = {
+                "file": filename,
+                "sha256": digest,
+                "bytes": len(payload),
+                "gzip_bytes": os.path.getsize(gz_path),
+            }
+        else:
+            payload = fig.to_image(format=fmt, width=1200, height=650, scale=1)
+            filename, digest = _write_hashed(out_dir, stem, fmt, payload)
+            entry[fmt] = {"file": filename, "sha256": digest, "bytes": len(payload)}
+    return asset_key(spec), entry
+
+
+def build(out_dir=OUT_DIR, formats=("html",), workers=None, base_url=BASE_URL):
+    formats = list(formats)
+    unknown = [f for f in formats if f not in ("html",) + IMAGE_FORMATS]
+    if unknown:
+        raise SystemExit(f"unknown format(s): {', '.join(unknown)}")
+    versions = data_store.publish_all()
+    _use_versions(versions)
+    os.makedirs(out_dir, exist_ok=True)
+    previous = load_manifest(out_dir)
+
+    jobs = asset_jobs(formats)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_use_versions,
+                             initargs=(versions,)) as pool:
+        results = pool.map(render, [s for s, _ in jobs], [f for _, f in jobs],
+                           [out_dir] * len(jobs))
+        assets = dict(results)
+
+    manifest = {
+        "data": versions,
+        "assets": assets,
+    }
+    if base_url:
+        manifest["base_url"] = base_url.rstrip("/")
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+
+    # 清理不再被引用的旧导出文件；--out 目录中的其它文件一律不动
+    referenced = manifest_files(manifest)
+    stale = manifest_files(previous) if previous else set()
+    for filename in os.listdir(out_dir):
+        if filename in referenced:
+            continue
+        if filename in stale or ASSET_PATTERN.match(filename):
+            os.remove(os.path.join(out_dir, filename))
+    return manifest
+
+
+def manifest_files(manifest):
+    """Every file name (and gzip sibling) a manifest refers to."""
+    files = set()
+    for entry in manifest.get("assets", {}).values():
+        for item in entry.values():
+            files.update({item["file"], item["file"] + ".gz"})
+    return files
+
+
+# =========================
+# 供 app.py 的 lite 模式读取
+# =========================
+def load_manifest(out_dir=OUT_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(manifest, versions):
+    """True if the assets were rendered from the given data versions."""
+    return manifest.get("data") == versions
+
+
+def base_url(manifest, out_dir=OUT_DIR):
+    """URL the exported files are served from, or None if they are not served.
+
+    The manifest's ``base_url`` (a CDN) wins; otherwise ``out_dir`` must
+    sit under ``static/`` so Streamlit's static file serving reaches it.
+    """
+    if manifest.get("base_url"):
+        return manifest["base_url"]
+    relative = os.path.relpath(os.path.abspath(out_dir), STATIC_ROOT)
+    if relative.startswith(os.pardir):
+        return None
+    if relative == os.curdir:
+        return STATIC_URL
+    return "/".join([STATIC_URL, *relative.split(os.sep)])
+
+
+def asset_url(manifest, spec, fmt, base):
+    """URL of a prebuilt asset under ``base``, or None if it was not exported."""
+    item = manifest["assets"].get(asset_key(spec), {}).get(fmt)
+    return f"{base}/{item['file']}" if item else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--formats", default="html",
+                        help="comma-separated: html, png, webp (default: html)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="render processes (default: CPU count)")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="serve the files from this URL (e.g. a CDN) instead of "
+                             "the app's /app/static/ (default: GW_STATIC_URL)")
+    args = parser.parse_args(argv)
+
+    manifest = build(args.out, args.formats.split(","), args.workers, args.base_url)
+    total = sum(item["bytes"] for entry in manifest["assets"].values()
+                for item in entry.values())
+    print(f"{len(manifest['assets'])} assets, {total / 2**20:.1f} MB "
+          f"written to {os.path.relpath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,668 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.graph_objects as go
+
+import quadrants
+import stats_table
+
+
+# =========================
+# 指标配置
+# =========================
+INDICATOR_CONFIG = {
+    "CCII": {
+        "column": "ccii",
+        "title": "Climate Commitment Intensity Index (CCII)",
+        "colorscale": ["#cce6ff", "#3399ff", "#003366"]  # 蓝
+    },
+    "GWE": {
+        "column": "gwe",
+        "title": "Greenwashing based on Environmental Score (GWE)",
+        "colorscale": ["#d9f2d9", "#4caf50", "#1b5e20"]  # 绿
+    },
+    "GWGHG": {
+        "column": "gwghg",
+        "title": "Greenwashing based on Carbon Emissions (GWGHG)",
+        "colorscale": ["#f5cccc", "#e53935", "#7f0000"]  # 红
+    }
+}
+
+SINGLE_YEAR = "Single Year"
+ANIMATED = "Animate Over Years"
+
+
+def _px():
+    # plotly.express 及其依赖导入较慢，第一次构建图时才加载
+    import plotly.express as px
+    return px
+
+
+# =========================
+# 全局地图
+# =========================
+def build_choropleth(df, indicator, mode, year=None):
+    config = INDICATOR_CONFIG[indicator]
+    col = config["column"]
+    title_name = config["title"]
+
+    if mode == SINGLE_YEAR:
+        fig = _px().choropleth(
+            df[df["year"] == year],
+            locations="iso3",
+            locationmode="ISO-3",
+            color=col,
+            color_continuous_scale=config["colorscale"],
+            hover_name="country",
+            hover_data={
+                "year": True,
+                col: True
+            },
+            title=f"Global Distribution of {title_name} ({year})"
+        )
+    else:
+        fig = build_animated_choropleth(df, indicator)
+
+    # 统一暗色风格
+    fig.update_layout(
+        margin=dict(l=0, r=0, t=60, b=0),
+        paper_bgcolor="#0E1117",
+        plot_bgcolor="#0E1117",
+        font_color="white",
+        coloraxis_colorbar=dict(
+            title=indicator
+        )
+    )
+    return fig
+
+
+def add_no_data_layer(fig, iso3, names):
+    """Grey out countries without a value, so "no data" is not read as a low value.
+
+    ``fig`` is left unchanged (it may be a cached figure); a copy is returned.
+    """
+    fig = go.Figure(fig)
+    fig.add_trace(go.Choropleth(
+        locations=list(iso3),
+        locationmode="ISO-3",
+        text=list(names),
+        z=[0] * len(names),
+        colorscale=[[0, "#555555"], [1, "#555555"]],
+        showscale=False,
+        hovertemplate="<b>%{text}</b><br>no data<extra></extra>",
+    ))
+    return fig
+
+
+# =========================
+# 大洲层面（数据来自 cube.py 的预计算聚合）
+# =========================
+def build_continent_choropleth(by_country, indicator, year):
+    """Countries shaded by their continent's mean firm-level ``indicator``.
+
+    The colour range spans all years so maps of different years compare.
+    """
+    config = INDICATOR_CONFIG[indicator]
+    col = f"{config['column']}_mean"
+    count = f"{config['column']}_count"
+    fig = _px().choropleth(
+        by_country[by_country["year"] == year],
+        locations="iso3",
+        locationmode="ISO-3",
+        color=col,
+        color_continuous_scale=config["colorscale"],
+        range_color=[by_country[col].min(), by_country[col].max()],
+        hover_name="continent",
+        hover_data={"country": True, "year": True, col: ":.3f", count: True, "iso3": False},
+        labels={col: f"{indicator} (continent mean)", count: "Firms"},
+        title=f"{config['title']} by Continent ({year})"
+    )
+    fig.update_layout(
+        margin=dict(l=0, r=0, t=60, b=0),
+        paper_bgcolor="#0E1117",
+        plot_bgcolor="#0E1117",
+        font_color="white",
+        coloraxis_colorbar=dict(title=indicator)
+    )
+    return fig
+
+
+def build_continent_lines(by_year, indicator):
+    """Small multiples: one panel per continent, mean ``indicator`` over years."""
+    config = INDICATOR_CONFIG[indicator]
+    col = f"{config['column']}_mean"
+    count = f"{config['column']}_count"
+    fig = _px().line(
+        by_year.sort_values("year"),
+        x="year",
+        y=col,
+        facet_col="continent",
+        facet_col_wrap=3,
+        markers=True,
+        hover_data={count: True},
+        labels={col: indicator, count: "Firms", "year": "Year"},
+        title=f"{config['title']} by Continent Over Time"
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1].title()))
+    fig.add_hline(y=0, line=dict(color="white", dash="dash", width=1))
+    fig.update_layout(
+        height=550,
+        paper_bgcolor="#0E1117",
+        plot_bgcolor="#0E1117",
+        font_color="white",
+        margin=dict(l=40, r=40, t=80, b=40)
+    )
+    return fig
+
+
+# =========================
+# 精简动画地图
+# =========================
+def _animation_controls(frame_names, duration=500):
+    play = dict(frame=dict(duration=duration, redraw=True), mode="immediate",
+                fromcurrent=True, transition=dict(duration=duration, easing="linear"))
+    pause = dict(frame=dict(duration=0, redraw=True), mode="immediate",
+                 transition=dict(duration=0))
+    updatemenus = [dict(
+        type="buttons", direction="left", showactive=False,
+        x=0.1, y=0, xanchor="right", yanchor="top", pad=dict(r=10, t=70),
+        buttons=[
+            dict(label="&#9654;", method="animate", args=[None, play]),
+            dict(label="&#9724;", method="animate", args=[[None], pause]),
+        ],
+    )]
+    sliders = [dict(
+        active=0, x=0.1, y=0, len=0.9, xanchor="left", yanchor="top",
+        pad=dict(b=10, t=60), currentvalue=dict(prefix="year="),
+        steps=[
+            dict(label=name, method="animate", args=[[name], pause])
+            for name in frame_names
+        ],
+    )]
+    return updatemenus, sliders
+
+
+def build_animated_choropleth(df, indicator):
+    """Animated map that sends locations and hover names once.
+
+    Each frame only carries that year's colour values as a float32 typed
+    array (NaN where the country has no data), instead of a full trace with
+    repeated location, hover_name and hover_data strings.
+    """
+    config = INDICATOR_CONFIG[indicator]
+    col = config["column"]
+
+    wide = df.pivot_table(index=["iso3", "country"], columns="year", values=col,
+                          aggfunc="first", dropna=False)
+    wide = wide.dropna(how="all")
+    years = [int(y) for y in wide.columns]
+    locations = wide.index.get_level_values("iso3").tolist()
+    names = wide.index.get_level_values("country").tolist()
+    values = wide.to_numpy(dtype=np.float32)
+
+    def hovertemplate(year):
+        return f"<b>%{{text}}</b><br>year={year}<br>{col}=%{{z}}<extra></extra>"
+
+    fig = go.Figure(
+        data=[go.Choropleth(
+            locations=locations,
+            locationmode="ISO-3",
+            text=names,
+            z=values[:, 0],
+            coloraxis="coloraxis",
+            hovertemplate=hovertemplate(years[0]),
+        )],
+        frames=[
+            go.Frame(
+                name=str(year),
+                traces=[0],
+                data=[go.Choropleth(z=values[:, i], hovertemplate=hovertemplate(year))],
+            )
+            for i, year in enumerate(years)
+        ],
+    )
+
+    updatemenus, sliders = _animation_controls([str(y) for y in years])
+    fig.update_layout(
+        title=f"Global Distribution of {config['title']} (Animated)",
+        coloraxis=dict(
+            colorscale=config["colorscale"],
+            cmin=float(np.nanmin(values)),
+            cmax=float(np.nanmax(values)),
+        ),
+        geo=dict(domain=dict(x=[0, 1], y=[0, 1]), center={}),
+        updatemenus=updatemenus,
+        sliders=sliders,
+    )
+    return fig
+
+
+# =========================
+# Top N 排名折线图
+# =========================
+def build_bump_chart(df_rank, metric_label, top_n=10):
+    fig_bump = _px().line(
+        df_rank,
+        x="year",
+        y="rank",
+        color="country",
+        markers=True,
+        title=f"Top {top_n} Countries by {metric_label} Over Time"
+    )
+
+    fig_bump.update_yaxes(
+        autorange="reversed",
+        title="Rank (1 = Highest)"
+    )
+
+    fig_bump.update_xaxes(title="Year")
+
+    fig_bump.update_layout(
+        height=650,
+        paper_bgcolor="#0E1117",
+        plot_bgcolor="#0E1117",
+        font_color="white",
+        legend_title_text="Country",
+        margin=dict(l=40, r=40, t=60, b=40)
+    )
+    return fig_bump
+
+
+# =========================
+# 行业四象限动画散点图
+# =========================
+def _padded_range(values, pad=0.05):
+    lo, hi = float(values.min()), float(values.max())
+    margin = (hi - lo) * pad
+    return [lo - margin, hi + margin]
+
+
+def build_industry_quadrant(df_ind, y_metric, color_label, year=None, stats=None,
+                            split=quadrants.GLOBAL_MEAN):
+    # 指定 year 时只画该年（静态导出用），坐标与十字线仍按全部年份计算
+    # 坐标范围、分界线和标注位置都取自汇总统计表，不再逐次扫描整列
+    if stats is None:
+        stats = stats_table.build_stats_table(df_ind, ["ccii", y_metric])
+    x_all = stats_table.metric_stats(stats, "ccii")
+    y_all = stats_table.metric_stats(stats, y_metric)
+    centers = quadrants.split_centers(stats, y_metric, split)
+
+    if year is None:
+        fig = _px().scatter(
+            df_ind,
+            x="ccii",
+            y=y_metric,
+            color=y_metric,
+            text="industry",
+            animation_frame="year",
+            color_continuous_scale="RdYlGn_r",
+            title=f"Industry CCII vs {color_label} (Animated)"
+        )
+    else:
+        fig = _px().scatter(
+            df_ind[df_ind["year"] == year],
+            x="ccii",
+            y=y_metric,
+            color=y_metric,
+            text="industry",
+            color_continuous_scale="RdYlGn_r",
+            range_color=[y_all["min"], y_all["max"]],
+            range_x=_padded_range(x_all[["min", "max"]]),
+            range_y=_padded_range(y_all[["min", "max"]]),
+            title=f"Industry CCII vs {color_label} ({year})"
+        )
+
+    fig.update_traces(
+        textposition="top center",
+        marker=dict(size=14, line=dict(width=1, color="white"))
+    )
+
+    extent = (x_all["min"], x_all["max"], y_all["min"], y_all["max"])
+    first_year = int(year) if year is not None else min(centers)
+    add_quadrant_guides(fig, *extent, y_center=centers[first_year])
+    if year is None and split != quadrants.GLOBAL_MEAN:
+        # 按年分界时，每一帧带上该年的十字线
+        for frame in fig.frames:
+            frame.layout = dict(shapes=quadrant_lines(*extent, centers[int(frame.name)]))
+    _quadrant_layout(fig, color_label)
+    fig.update_layout(coloraxis_colorbar=dict(title=color_label))
+    return fig
+
+
+def quadrant_lines(x_min, x_max, y_min, y_max, y_center):
+    x_center = quadrants.X_CENTER  # CCII 基准
+    return [
+        dict(type="line", x0=x_center, x1=x_center,
+             y0=y_min, y1=y_max,
+             line=dict(color="white", dash="dash")),
+        dict(type="line", x0=x_min, x1=x_max,
+             y0=y_center, y1=y_center,
+             line=dict(color="white", dash="dash")),
+    ]
+
+
+def add_quadrant_guides(fig, x_min, x_max, y_min, y_max, y_center, entity="Industry"):
+    # 添加中心十字线
+    for shape in quadrant_lines(x_min, x_max, y_min, y_max, y_center):
+        fig.add_shape(**shape)
+
+    # 四象限标注文字
+    annotations = [
+        dict(x=x_max*0.6, y=y_max*0.9,
+             text="High CCII<br>High Greenwashing<br>(Symbolic Commitment)",
+             showarrow=False, font=dict(color="white", size=12), align="center"),
+        dict(x=x_min*0.6, y=y_max*0.9,
+             text="Low CCII<br>High Greenwashing<br>(Formalist / Passive)",
+             showarrow=False, font=dict(color="white", size=12), align="center"),
+        dict(x=x_min*0.6, y=y_min*0.9,
+             text=f"Low CCII<br>Low Greenwashing<br>(Low-risk {entity})",
+             showarrow=False, font=dict(color="white", size=12), align="center"),
+        dict(x=x_max*0.6, y=y_min*0.9,
+             text="High CCII<br>Low Greenwashing<br>(Substantive Commitment)",
+             showarrow=False, font=dict(color="white", size=12), align="center"),
+    ]
+    fig.update_layout(annotations=annotations)
+
+
+def _quadrant_layout(fig, color_label):
+    # 图布局
+    fig.update_layout(
+        height=650,
+        paper_bgcolor="#0E1117",
+        plot_bgcolor="#0E1117",
+        font_color="white",
+        xaxis_title="Climate Commitment Intensity Index (CCII)",
+        yaxis_title=color_label,
+        margin=dict(l=40, r=40, t=60, b=40),
+    )
+
+
+# =========================
+# 象限转移桑基图
+# =========================
+# 顺序与 quadrants.QUADRANTS 一致
+QUADRANT_COLORS = ("#e53935", "#ffb300", "#9e9e9e", "#4caf50")
+
+
+def build_quadrant_sankey(matrix, year_from, year_to, color_label):
+    """Sankey of quadrant moves between two years from a from x to count table."""
+    labels = list(matrix.index)
+    counts = matrix.to_numpy()
+    source, target = np.nonzero(counts)
+    fig = go.Figure(go.Sankey(
+        node=dict(
+            label=[f"{q} ({year_from})" for q in labels] + [f"{q} ({year_to})" for q in labels],
+            color=list(QUADRANT_COLORS) * 2,
+            pad=15,
+            thickness=15,
+        ),
+        link=dict(
+            source=source.tolist(),
+            target=(target + len(labels)).tolist(),
+            value=counts[source, target].tolist(),
+            color="rgba(255,255,255,0.25)",
+        ),
+    ))
+    fig.update_layout(
+        title=f"Industry quadrant moves by {color_label}, {year_from} → {year_to}",
+        height=450,
+        paper_bgcolor="#0E1117",
+        font_color="white",
+        margin=dict(l=40, r=40, t=60, b=40),
+    )
+    return fig
+
+
+# =========================
+# 企业层面四象限散点图（WebGL，适合每年数万个点）
+# =========================
+def firm_points(engine, y_metric, year):
+    """One row per firm in ``year`` with both coordinates present."""
+    table = engine.select(columns=["country", "industry", "ccii", y_metric], year=year)
+    return table.to_pandas().dropna(subset=["ccii", y_metric]).reset_index(drop=True)
+
+
+def build_firm_quadrant(points, y_metric, color_label, year, extents):
+    """Scattergl version of the industry quadrant for firm-level points.
+
+    ``extents`` maps "ccii" and ``y_metric`` to (min, max, mean) over all
+    years, so axes, colours and quadrant lines stay put as the year
+    changes. Firm names only appear on hover; see ``label_points``.
+    """
+    x_min, x_max, _ = extents["ccii"]
+    y_min, y_max, y_mean = extents[y_metric]
+    y = points[y_metric].to_numpy()
+    fig = go.Figure(go.Scattergl(
+        x=points["ccii"].to_numpy(),
+        y=y,
+        mode="markers",
+        text=points["country"].astype(str) + " · " + points["industry"].astype(str),
+        hovertemplate=("%{text}<br>CCII=%{x:.3f}<br>"
+                       + color_label + "=%{y:.3f}<extra></extra>"),
+        marker=dict(
+            size=5,
+            opacity=0.7,
+            color=y,
+            colorscale="RdYlGn_r",
+            cmin=y_min,
+            cmax=y_max,
+            colorbar=dict(title=color_label),
+        ),
+    ))
+    add_quadrant_guides(fig, x_min, x_max, y_min, y_max, y_center=y_mean, entity="Firm")
+    _quadrant_layout(fig, color_label)
+    fig.update_layout(
+        title=f"Firm CCII vs {color_label} ({year}, {len(points):,} firms)",
+        xaxis_range=_padded_range(np.array([x_min, x_max])),
+        yaxis_range=_padded_range(np.array([y_min, y_max])),
+        dragmode="lasso",
+    )
+    return fig
+
+
+def label_points(fig, points, indices, y_metric, limit=50):
+    """Overlay text labels for the selected firms (at most ``limit``).
+
+    ``fig`` is left unchanged (it may be a cached figure); a copy is returned.
+    """
+    picked = points.iloc[sorted(indices)[:limit]]
+    fig = go.Figure(fig)
+    fig.add_trace(go.Scattergl(
+        x=picked["ccii"].to_numpy(),
+        y=picked[y_metric].to_numpy(),
+        mode="markers+text",
+        text=picked["country"].astype(str) + " · " + picked["industry"].astype(str),
+        textposition="top center",
+        textfont=dict(color="white", size=11),
+        marker=dict(size=9, color="rgba(0,0,0,0)", line=dict(width=1.5, color="white")),
+        hoverinfo="skip",
+        showlegend=False,
+    ))
+    return fig
+
+
+# =========================
+# 企业层面密度图：按年二维分箱，只发送每格的计数和均值
+# =========================
+def bin_firms(engine, y_metric, bins=40):
+    """Count every firm-year on one fixed CCII x ``y_metric`` grid.
+
+    Returns ``(years, x_edges, y_edges, counts, means)``. ``counts`` and
+    ``means`` have shape (years, y bins, x bins); ``means`` is the mean
+    ``y_metric`` of the firms in each cell, NaN where the cell is empty.
+    """
+    table = engine.select(columns=["year", "ccii", y_metric])
+    year = table.column("year").to_numpy()
+    x = table.column("ccii").to_numpy(zero_copy_only=False)
+    y = table.column(y_metric).to_numpy(zero_copy_only=False)
+    keep = ~(np.isnan(x) | np.isnan(y))
+
+    years = np.array(engine.years)
+    year_edges = np.append(years, years[-1] + 1) - 0.5
+    x_min, x_max, _ = engine.extent("ccii")
+    y_min, y_max, _ = engine.extent(y_metric)
+    x_edges = np.linspace(x_min, x_max, bins + 1)
+    y_edges = np.linspace(y_min, y_max, bins + 1)
+
+    # 一次分箱得到所有年份；以 y 为权重再分一次得到每格总和
+    sample = (year[keep], y[keep], x[keep])
+    edges = (year_edges, y_edges, x_edges)
+    counts, _ = np.histogramdd(sample, bins=edges)
+    sums, _ = np.histogramdd(sample, bins=edges, weights=y[keep])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return [int(y) for y in years], x_edges, y_edges, counts, means
+
+
+def build_firm_density(binned, y_metric, color_label, extents):
+    """Animated 2-D histogram of firms per year with the quadrant overlay.
+
+    Each frame carries only the bin counts and mean ``y_metric`` per bin as
+    float32 arrays, so the payload grows with the bin count rather than with
+    the number of firms.
+    """
+    years, x_edges, y_edges, counts, means = binned
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    # 空格子设为 NaN，显示为透明
+    z = np.where(counts > 0, counts, np.nan).astype(np.float32)
+    means = means.astype(np.float32)
+    hovertemplate = ("CCII=%{x:.2f}<br>" + color_label + "=%{y:.2f}<br>"
+                     "firms=%{z:.0f}<br>mean " + color_label
+                     + "=%{customdata:.3f}<extra></extra>")
+
+    fig = go.Figure(
+        data=[go.Heatmap(
+            x=x_centers,
+            y=y_centers,
+            z=z[0],
+            customdata=means[0],
+            coloraxis="coloraxis",
+            hovertemplate=hovertemplate,
+        )],
+        frames=[
+            go.Frame(
+                name=str(year),
+                traces=[0],
+                data=[go.Heatmap(z=z[i], customdata=means[i])],
+            )
+            for i, year in enumerate(years)
+        ],
+    )
+
+    x_min, x_max, _ = extents["ccii"]
+    y_min, y_max, y_mean = extents[y_metric]
+    add_quadrant_guides(fig, x_min, x_max, y_min, y_max, y_center=y_mean, entity="Firm")
+    _quadrant_layout(fig, color_label)
+    updatemenus, sliders = _animation_controls([str(y) for y in years])
+    fig.update_layout(
+        title=f"Firm CCII vs {color_label} (Density, Animated)",
+        coloraxis=dict(
+            colorscale="Viridis",
+            cmin=1,
+            cmax=float(np.nanmax(z)),
+            colorbar=dict(title="Firms"),
+        ),
+        updatemenus=updatemenus,
+        sliders=sliders,
+    )
+    return fig
+
+
+# =========================
+# 图表缓存（进程内共享，所有会话共用）
+# =========================
+class FigureCache:
+    """Bounded LRU cache of built figures, shared by every session.
+
+    Cached figures are shared objects: pass them to ``st.plotly_chart``
+    as they are (it only calls ``to_dict`` on a Figure, instead of
+    validating it again) and copy with ``go.Figure(fig)`` before changing
+    one.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        # 构建在锁外进行，避免一个慢构建阻塞其它会话
+        fig = build()
+
+        with self._lock:
+            self._items[key] = fig
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches ``predicate``; returns the count."""
+        with self._lock:
+            stale = [key for key in self._items if predicate(key)]
+            for key in stale:
+                del self._items[key]
+        return len(stale)
+
+    def __len__(self):
+        return len(self._items)
+
+
+figure_cache = FigureCache()
+
+
+# 缓存键为 (图类型, 数据集, 数据版本, ...)；数据版本见 data_store.publish，
+# 数据更新后旧图不会再被命中
+def choropleth(df, indicator, mode, year=None, version=None):
+    key = ("choropleth", "country", version, indicator, mode,
+           None if mode == ANIMATED else int(year))
+    return figure_cache.get(key, lambda: build_choropleth(df, indicator, mode, year))
+
+
+def industry_quadrant(df_ind, y_metric, color_label, stats, split=quadrants.GLOBAL_MEAN,
+                      version=None):
+    key = ("industry_quadrant", "industry", version, y_metric, split)
+    return figure_cache.get(key, lambda: build_industry_quadrant(
+        df_ind, y_metric, color_label, stats=stats, split=split
+    ))
+
+
+def firm_quadrant(engine, y_metric, color_label, year, version=None):
+    key = ("firm_quadrant", "firm", version, y_metric, int(year))
+    return figure_cache.get(key, lambda: build_firm_quadrant(
+        firm_points(engine, y_metric, year), y_metric, color_label, year,
+        {m: engine.extent(m) for m in ("ccii", y_metric)},
+    ))
+
+
+def firm_density(engine, y_metric, color_label, bins=40, version=None):
+    key = ("firm_density", "firm", version, y_metric, bins)
+    return figure_cache.get(key, lambda: build_firm_density(
+        bin_firms(engine, y_metric, bins), y_metric, color_label,
+        {m: engine.extent(m) for m in ("ccii", y_metric)},
+    ))
+
+
+def continent_choropleth(by_country, indicator, year, version=None):
+    key = ("continent_choropleth", "firm", version, indicator, int(year))
+    return figure_cache.get(key, lambda: build_continent_choropleth(by_country, indicator, year))
+
+
+def continent_lines(by_year, indicator, version=None):
+    key = ("continent_lines", "firm", version, indicator)
+    return figure_cache.get(key, lambda: build_continent_lines(by_year, indicator))
@@ -0,0 +1,141 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import data_store
+
+
+# =========================
+# 企业层面查询层
+# =========================
+DIMENSIONS = ("year", "country", "continent", "industry")
+MEASURES = ("enscore", "enero91v", "ccii", "gwe", "gwghg")
+
+# 统计量 -> pyarrow 分组聚合函数；median 需要精确值，单独用 pandas 计算
+ARROW_STATS = {
+    "mean": ("mean", None),
+    "count": ("count", None),
+    "std": ("stddev", pc.VarianceOptions(ddof=1)),
+    "min": ("min", None),
+    "max": ("max", None),
+    "sum": ("sum", None),
+}
+STATS = tuple(ARROW_STATS) + ("median",)
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set, frozenset, range, np.ndarray, pd.Index)):
+        return list(value)
+    return [value]
+
+
+class FirmQuery:
+    """Filtered and aggregated queries over the memory-mapped firm table.
+
+    The table is stored sorted by year, so a year filter is a zero-copy
+    slice; the remaining dimensions are filtered with a vectorised mask.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        years = table.column("year").to_numpy()
+        uniq, starts = np.unique(years, return_index=True)
+        ends = list(starts[1:]) + [len(years)]
+        self._year_slices = {
+            int(y): (int(s), int(e - s)) for y, s, e in zip(uniq, starts, ends)
+        }
+
+    @property
+    def years(self):
+        return sorted(self._year_slices)
+
+    def values(self, dimension):
+        if dimension == "year":
+            return self.years
+        return sorted(pc.unique(self.table.column(dimension)).to_pylist())
+
+    def extent(self, metric):
+        """(min, max, mean) of ``metric`` over every firm and year, nulls ignored."""
+        column = self.table.column(metric)
+        bounds = pc.min_max(column)
+        return (bounds["min"].as_py(), bounds["max"].as_py(), pc.mean(column).as_py())
+
+    def select(self, columns=None, year=None, country=None, continent=None,
+               industry=None):
+        if year is None:
+            table = self.table
+        else:
+            # 去重并统一成 int，重复的年份不会让同一切片出现两次
+            parts = [
+                self.table.slice(*self._year_slices[y])
+                for y in sorted({int(y) for y in _as_list(year)})
+                if y in self._year_slices
+            ]
+            table = pa.concat_tables(parts) if parts else self.table.slice(0, 0)
+
+        mask = None
+        for dim, value in (("country", country), ("continent", continent),
+                           ("industry", industry)):
+            if value is None:
+                continue
+            cond = pc.is_in(table.column(dim), value_set=pa.array(_as_list(value)))
+            mask = cond if mask is None else pc.and_(mask, cond)
+        if mask is not None:
+            table = table.filter(mask)
+
+        if columns is not None:
+            table = table.select(list(columns))
+        return table
+
+    def aggregate(self, by, metrics=MEASURES, stats=("mean", "count"), **filters):
+        by = _as_list(by)
+        metrics = _as_list(metrics)
+        stats = _as_list(stats)
+        unknown = [s for s in stats if s not in STATS]
+        if unknown:
+            raise ValueError(f"Unknown statistic(s): {unknown}; choose from {STATS}")
+
+        table = self.select(columns=by + metrics, **filters)
+
+        specs = []
+        for m in metrics:
+            for s in stats:
+                if s in ARROW_STATS:
+                    func, opts = ARROW_STATS[s]
+                    specs.append((m, func, opts))
+        result = (
+            table.group_by(by, use_threads=False)
+            .aggregate(specs)
+            .to_pandas()
+        )
+        result = result.rename(columns={
+            f"{m}_{ARROW_STATS[s][0]}": f"{m}_{s}"
+            for m in metrics for s in stats if s in ARROW_STATS
+        })
+
+        if "median" in stats:
+            medians = (
+                table.to_pandas()
+                .groupby(by, observed=True)[metrics]
+                .median()
+                .add_suffix("_median")
+                .reset_index()
+            )
+            result = result.merge(medians, on=by, how="left")
+
+        ordered = by + [f"{m}_{s}" for m in metrics for s in stats]
+        return result[ordered].sort_values(by, ignore_index=True)
+
+
+def open_firm_query(version):
+    return FirmQuery(data_store.read_table("firm", version))
+
+
+if __name__ == "__main__":
+    # 例：python firm_query.py continent year
+    engine = open_firm_query(data_store.publish("firm"))
+    by = sys.argv[1:] or ["year"]
+    print(engine.aggregate(by, metrics=("ccii", "gwe", "gwghg")).to_string())
@@ -0,0 +1,210 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+
+# =========================
+# 点赞计数（SQLite WAL）
+# =========================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.environ.get("GW_COUNTER_DB", os.path.join(BASE_DIR, "like_counter.db"))
+LEGACY_FILE = os.path.join(BASE_DIR, "like_counter.txt")
+
+COUNTERS = ("like", "really_like")
+
+
+def read_legacy(path=LEGACY_FILE):
+    """Counts from the old ``like,really_like`` text file, used as the seed."""
+    try:
+        with open(path, "r") as f:
+            like, really_like = f.read().strip().split(",")
+        return {"like": int(like), "really_like": int(really_like)}
+    except (OSError, ValueError):
+        return {name: 0 for name in COUNTERS}
+
+
+class CounterStore:
+    """Atomic counters shared by every session and server process.
+
+    Increments are single UPDATE statements, so concurrent clicks are never
+    lost. Reads are served from memory for ``ttl`` seconds.
+    """
+
+    def __init__(self, path=DB_FILE, ttl=2.0):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cached = None
+        self._cached_at = 0.0
+        self._setup()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _setup(self):
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters "
+            "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        seed = read_legacy()
+        # 只在首次建库时写入旧文件中的计数
+        conn.executemany(
+            "INSERT OR IGNORE INTO counters (name, value) VALUES (?, ?)",
+            [(name, seed.get(name, 0)) for name in COUNTERS],
+        )
+
+    def read(self):
+        with self._lock:
+            if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+                return dict(self._cached)
+        rows = self._connect().execute("SELECT name, value FROM counters").fetchall()
+        counts = {name: 0 for name in COUNTERS}
+        counts.update(rows)
+        with self._lock:
+            self._cached = counts
+            self._cached_at = time.monotonic()
+        return dict(counts)
+
+    def increment(self, name, amount=1):
+        return self.add_many({name: amount})[name]
+
+    def add_many(self, deltas):
+        """Apply several increments in one transaction; returns new values."""
+        for name in deltas:
+            if name not in COUNTERS:
+                raise ValueError(f"Unknown counter '{name}'; choose from {COUNTERS}")
+        conn = self._connect()
+        values = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, amount in deltas.items():
+                (values[name],) = conn.execute(
+                    "UPDATE counters SET value = value + ? WHERE name = ? RETURNING value",
+                    (amount, name),
+                ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            if self._cached is not None:
+                self._cached.update(values)
+        return values
+
+
+# =========================
+# 批量延迟写入
+# =========================
+class WriteBehindCounter:
+    """Buffer clicks in memory and flush them to a CounterStore in batches.
+
+    A background thread writes the pending deltas every ``interval``
+    seconds, or sooner once ``max_pending`` clicks have accumulated.
+    Pending clicks are flushed on interpreter exit. ``read()`` never
+    touches the database: it returns an in-memory snapshot of the persisted
+    totals plus the clicks being written and still pending. The snapshot is
+    updated from each flush's result and reloaded on the flush thread after
+    every cycle, so clicks from other processes show up within ``interval``.
+    """
+
+    def __init__(self, store, interval=5.0, max_pending=50):
+        self.store = store
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {name: 0 for name in COUNTERS}
+        self._inflight = {}
+        self._persisted = store.read()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="like-counter-flush", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def increment(self, name, amount=1):
+        if name not in COUNTERS:
+            raise ValueError(f"Unknown counter '{name}'; choose from {COUNTERS}")
+        with self._lock:
+            self._pending[name] += amount
+            if sum(self._pending.values()) >= self.max_pending:
+                self._wake.set()
+        return self.read()[name]
+
+    def read(self):
+        with self._lock:
+            counts = dict(self._persisted)
+            for name, delta in self._pending.items():
+                counts[name] += delta + self._inflight.get(name, 0)
+        return counts
+
+    def refresh(self):
+        """Reload the persisted totals, e.g. clicks flushed by other processes."""
+        with self._lock:
+            if self._inflight:
+                return
+            generation = self._generation
+        counts = self.store.read()
+        with self._lock:
+            # 读库期间开始了写入：读到的值是否含这批增量无法确定，保留现有快照
+            if self._generation == generation:
+                self._persisted = counts
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        with self._lock:
+            deltas = {name: n for name, n in self._pending.items() if n}
+            for name in deltas:
+                self._pending[name] = 0
+            self._inflight = deltas
+            if deltas:
+                self._generation += 1
+        if not deltas:
+            return
+        try:
+            values = self.store.add_many(deltas)
+        except BaseException:
+            # 写入失败时把增量放回，下次再试
+            with self._lock:
+                for name, n in deltas.items():
+                    self._pending[name] += n
+                self._inflight = {}
+            raise
+        # 快照更新与清空 in-flight 在同一临界区内完成，读者不会重复或漏计
+        with self._lock:
+            self._persisted.update(values)
+            self._inflight = {}
+            self._generation += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.refresh()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=self.interval + 1)
+        self.flush()
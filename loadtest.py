@@ -0,0 +1,327 @@
+"""Simulate concurrent viewers of one dashboard server and report rerun latency.
+
+Starts ``streamlit run app.py`` (or uses ``--url``) and connects every
+simulated session to it over ``/_stcore/stream``, the websocket a browser
+uses. Each session walks a real widget sequence (switch indicator, toggle
+"Animate Over Years", change the Top N metric, click Like), sending the
+same protobuf messages as the browser, so widgets inside fragments rerun
+only their fragment. A step's latency is the time from sending the
+interaction to the server reporting the run finished.
+
+All sessions run at once against the same process, sharing its caches.
+Memory per session is the server's RSS with all sessions connected minus
+its RSS with one warm-up session connected, divided by the session count.
+
+    python loadtest.py --sessions 40
+    python loadtest.py --sessions 20 --url http://localhost:8501   # no memory/CPU figures
+
+Needs the ``websockets`` package.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def _require_websockets():
+    try:
+        from websockets.asyncio.client import connect
+    except ImportError:
+        raise SystemExit("the load test needs the 'websockets' package: pip install websockets")
+    return connect
+
+
+# =========================
+# 模拟一个会话的操作序列：(步骤名, 控件类型, 标签, 新值)
+# =========================
+STEPS = [
+    ("open", None, None, None),
+    ("indicator", "radio", "Select Indicator:", "GWE"),
+    ("animate", "radio", "Display Mode:", "Animate Over Years"),
+    ("top_metric", "selectbox", "Select Index:", "Greenwashing Index (GWGHG)"),
+    ("like", "button", "⭐ Like", True),
+]
+
+FINISHED = ("FINISHED_SUCCESSFULLY", "FINISHED_FRAGMENT_RUN_SUCCESSFULLY")
+
+
+class Session:
+    """One simulated browser tab on the app's websocket."""
+
+    def __init__(self, ws, timeout):
+        self.ws = ws
+        self.timeout = timeout
+        self.page_script_hash = ""
+        self.widgets = {}   # 控件 id -> (控件类型, 标签, 所在 fragment id)，按页面顺序
+        self.states = {}    # 控件 id -> WidgetState，每次重跑都发送
+        self.errors = []
+
+    def _widget(self, kind, label):
+        # 同名控件取页面上的第一个
+        for widget_id, (found_kind, found_label, fragment_id) in self.widgets.items():
+            if found_kind == kind and found_label == label:
+                return widget_id, fragment_id
+        labels = ", ".join(repr(w[1]) for w in self.widgets.values()) or "none"
+        raise LookupError(f"no {kind} labelled {label!r} (found: {labels})")
+
+    async def interact(self, kind, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, fragment_id = self._widget(kind, label)
+        state = WidgetState(id=widget_id)
+        if kind == "button":
+            state.trigger_value = bool(value)
+        else:
+            state.string_value = str(value)
+        self.states[widget_id] = state
+        await self.rerun(fragment_id)
+        # 按钮只触发一次，和浏览器一致
+        if kind == "button":
+            del self.states[widget_id]
+
+    async def rerun(self, fragment_id=""):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.query_string = ""
+        client_state.page_script_hash = self.page_script_hash
+        client_state.widget_states.widgets.extend(self.states.values())
+        if fragment_id:
+            client_state.fragment_id = fragment_id
+        await self.ws.send(msg.SerializeToString())
+        await asyncio.wait_for(self._until_finished(), self.timeout)
+
+    async def _until_finished(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = msg.new_session.page_script_hash
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._record(msg.delta.new_element, msg.delta.fragment_id)
+            elif kind == "script_finished":
+                status = ForwardMsg.ScriptFinishedStatus.Name(msg.script_finished)
+                if status in FINISHED:
+                    return
+                if status != "FINISHED_EARLY_FOR_RERUN":
+                    raise RuntimeError(f"script ended with {status}")
+
+    def _record(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+        elif kind in ("radio", "selectbox", "button", "checkbox", "slider"):
+            proto = getattr(element, kind)
+            self.widgets[proto.id] = (kind, proto.label, fragment_id)
+
+
+async def run_session(url, timeout, walked, done):
+    """Walk STEPS on a new connection, then stay connected until ``done`` is set.
+
+    The step timings (or the error that stopped the walk) go to the
+    ``walked`` future as soon as the last step finishes.
+    """
+    connect = _require_websockets()
+    stream = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+    try:
+        async with connect(stream, subprotocols=["streamlit"], max_size=None,
+                           open_timeout=timeout, ping_interval=None) as ws:
+            session = Session(ws, timeout)
+            timings = []
+            for name, kind, label, value in STEPS:
+                start = time.perf_counter()
+                if kind is None:
+                    await session.rerun()
+                else:
+                    await session.interact(kind, label, value)
+                timings.append((name, time.perf_counter() - start))
+                if session.errors:
+                    raise RuntimeError(f"step '{name}' raised: {session.errors[0]}")
+            walked.set_result(timings)
+            # 会话在服务器上保持存活，内存才能按会话数计算
+            await done.wait()
+    except Exception as exc:
+        if not walked.done():
+            walked.set_exception(exc)
+
+
+async def run_load(url, sessions, timeout, server_pid=None):
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+
+    def start(count):
+        futures = [loop.create_future() for _ in range(count)]
+        tasks = [asyncio.create_task(run_session(url, timeout, f, done)) for f in futures]
+        return futures, tasks
+
+    # 先跑完一个会话：缓存预热，同时作为内存基线
+    (warm,), connections = start(1)
+    await warm
+    rss_base, cpu_base = _process_usage(server_pid)
+
+    begin = time.perf_counter()
+    futures, tasks = start(sessions)
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    wall = time.perf_counter() - begin
+    rss_after, cpu_after = _process_usage(server_pid)
+
+    done.set()
+    await asyncio.gather(*connections, *tasks)
+    return {
+        "timings": [t for r in results if not isinstance(r, BaseException) for t in r],
+        "errors": [repr(r) for r in results if isinstance(r, BaseException)],
+        "wall_s": wall,
+        "cpu_s": cpu_after - cpu_base,
+        "mem_mb": rss_after - rss_base,
+        "sessions": sessions,
+    }
+
+
+# =========================
+# 服务器进程
+# =========================
+def _process_usage(pid):
+    """(RSS in MB, CPU seconds) of process ``pid`` from /proc; NaN if unknown."""
+    if pid is None:
+        return float("nan"), float("nan")
+    with open(f"/proc/{pid}/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as f:
+        # 进程名可能含空格，从右括号之后开始数字段
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return rss_kb / 1024, (int(fields[11]) + int(fields[12])) / ticks
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(counter_db, timeout):
+    """Run ``streamlit run app.py`` on a free port; returns (process, url)."""
+    port = _free_port()
+    env = dict(os.environ, GW_COUNTER_DB=counter_db)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_FILE,
+         "--server.headless=true", f"--server.port={port}",
+         "--server.address=127.0.0.1", "--browser.gatherUsageStats=false"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"streamlit exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"streamlit did not become healthy within {timeout:.0f}s")
+
+
+# =========================
+# 统计
+# =========================
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarise(result):
+    timings = result["timings"]
+    sessions = result["sessions"]
+    wall = result["wall_s"]
+    by_step = {}
+    for name, seconds in timings:
+        by_step.setdefault(name, []).append(seconds)
+    all_times = [s for _, s in timings]
+
+    rows = []
+    for name in [s[0] for s in STEPS] + ["all"]:
+        values = all_times if name == "all" else by_step.get(name, [])
+        rows.append({
+            "step": name,
+            "n": len(values),
+            "p50_ms": percentile(values, 50) * 1e3,
+            "p95_ms": percentile(values, 95) * 1e3,
+            "p99_ms": percentile(values, 99) * 1e3,
+            "mean_ms": (statistics.fmean(values) * 1e3) if values else float("nan"),
+        })
+
+    return {
+        "sessions": sessions,
+        "errors": result["errors"],
+        "wall_s": wall,
+        "reruns_per_s": len(all_times) / wall if wall else float("nan"),
+        "cpu_per_session_s": result["cpu_s"] / sessions if sessions else float("nan"),
+        "mem_per_session_mb": result["mem_mb"] / sessions if sessions else float("nan"),
+        "steps": rows,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20,
+                        help="concurrent simulated sessions on the one server")
+    parser.add_argument("--url", help="use this running server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="per-rerun timeout in seconds (also server start-up)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+    _require_websockets()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        url = args.url
+        if url is None:
+            # 点赞写入临时库，不影响真实计数
+            process, url = start_server(os.path.join(tmp, "like_counter.db"), args.timeout)
+        try:
+            result = asyncio.run(run_load(url, args.sessions, args.timeout,
+                                          process.pid if process else None))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    summary = summarise(result)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"sessions: {summary['sessions']}  wall: {summary['wall_s']:.1f}s  "
+              f"reruns/s: {summary['reruns_per_s']:.1f}")
+        print(f"server cpu/session: {summary['cpu_per_session_s'] * 1e3:.0f}ms  "
+              f"server memory/session: {summary['mem_per_session_mb']:.1f}MB")
+        print(f"{'step':12s} {'n':>5s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+        for row in summary["steps"]:
+            print(f"{row['step']:12s} {row['n']:5d} {row['p50_ms']:7.0f}ms "
+                  f"{row['p95_ms']:7.0f}ms {row['p99_ms']:7.0f}ms")
+        for err in summary["errors"][:5]:
+            print(f"error: {err}")
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Quadrant membership and year-to-year quadrant transitions.
+
+Uses the same split as the quadrant charts: CCII above or below 0, and
+the greenwashing index above or below its mean over all years (or, with
+``split``, its mean or median in each year).
+
+    python quadrants.py gwe                    # transition counts for every year pair
+    python quadrants.py gwe "Per-year median"
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import stats_table
+
+
+# =========================
+# 四个象限（顺序即编号，与图中标注一致）
+# =========================
+QUADRANTS = (
+    "Symbolic Commitment",     # 高 CCII，高漂绿
+    "Formalist / Passive",     # 低 CCII，高漂绿
+    "Low-risk",                # 低 CCII，低漂绿
+    "Substantive Commitment",  # 高 CCII，低漂绿
+)
+X_CENTER = 0  # CCII 基准
+NO_DATA = -1
+
+# 漂绿指标的分界：全部年份的均值，或每年各自的均值 / 中位数
+GLOBAL_MEAN = "Global mean"
+SPLITS = {
+    GLOBAL_MEAN: (stats_table.ALL_YEARS, "mean"),
+    "Per-year mean": ("year", "mean"),
+    "Per-year median": ("year", "median"),
+}
+
+
+def split_centers(stats, y_metric, split=GLOBAL_MEAN):
+    """Horizontal split value of ``y_metric`` for each year, from a stats table."""
+    scope, stat = SPLITS[split]
+    rows = stats.loc[y_metric]
+    years = [y for y in rows.index if y != stats_table.ALL_YEARS]
+    if scope == stats_table.ALL_YEARS:
+        return dict.fromkeys(years, float(rows.loc[stats_table.ALL_YEARS, stat]))
+    return {y: float(rows.loc[y, stat]) for y in years}
+
+
+def classify(x, y, y_center, x_center=X_CENTER):
+    """Quadrant number (index into QUADRANTS) for each point; -1 if x or y is missing."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    high_x = x >= x_center
+    high_y = y >= y_center
+    codes = np.where(high_y, np.where(high_x, 0, 1), np.where(high_x, 3, 2))
+    codes[np.isnan(x) | np.isnan(y)] = NO_DATA
+    return codes.astype(np.int8)
+
+
+def quadrant_table(df, y_metric, entity="industry", stats=None, split=GLOBAL_MEAN):
+    """Quadrant number per entity (rows) and year (columns); -1 where missing."""
+    if stats is None:
+        stats = stats_table.build_stats_table(df, [y_metric])
+    centers = split_centers(stats, y_metric, split)
+    y_center = df["year"].astype(int).map(centers).to_numpy(dtype=np.float64)
+    codes = classify(df["ccii"], df[y_metric], y_center)
+    long = pd.DataFrame({
+        entity: df[entity].astype(str).to_numpy(),
+        "year": df["year"].astype(int).to_numpy(),
+        "quadrant": codes,
+    })
+    wide = long.pivot_table(index=entity, columns="year", values="quadrant",
+                            aggfunc="first")
+    return wide.fillna(NO_DATA).astype(np.int8)
+
+
+# =========================
+# 年度转移矩阵
+# =========================
+def transition_counts(wide):
+    """Transition counts between consecutive years, for all year pairs at once.
+
+    Returns ``(pairs, counts)``: ``pairs`` lists (year_from, year_to) and
+    ``counts[i, a, b]`` is the number of entities in quadrant ``a`` in the
+    first year of pair ``i`` and quadrant ``b`` in the second. Entities
+    missing in either year are left out.
+    """
+    years = [int(y) for y in wide.columns]
+    codes = wide.to_numpy()
+    before, after = codes[:, :-1], codes[:, 1:]
+    n = len(QUADRANTS)
+    pair = np.broadcast_to(np.arange(len(years) - 1), before.shape)
+    valid = (before >= 0) & (after >= 0)
+    flat = (pair * n * n + before * n + after)[valid]
+    counts = np.bincount(flat, minlength=(len(years) - 1) * n * n)
+    return list(zip(years[:-1], years[1:])), counts.reshape(-1, n, n)
+
+
+def transition_matrix(counts, index):
+    """Labelled from-quadrant x to-quadrant table for one year pair."""
+    return pd.DataFrame(counts[index], index=list(QUADRANTS), columns=list(QUADRANTS))
+
+
+def movers(wide, year_from, year_to):
+    """Entities whose quadrant changed between the two years."""
+    before = wide[year_from].to_numpy()
+    after = wide[year_to].to_numpy()
+    moved = (before >= 0) & (after >= 0) & (before != after)
+    labels = np.array(QUADRANTS)
+    return pd.DataFrame({
+        wide.index.name: wide.index[moved],
+        "from": labels[before[moved]],
+        "to": labels[after[moved]],
+    })
+
+
+if __name__ == "__main__":
+    y_metric = sys.argv[1] if len(sys.argv) > 1 else "gwe"
+    split = sys.argv[2] if len(sys.argv) > 2 else GLOBAL_MEAN
+    df = data_store.load_dataset("industry", data_store.publish("industry"))
+    wide = quadrant_table(df, y_metric, split=split)
+    pairs, counts = transition_counts(wide)
+    for i, (a, b) in enumerate(pairs):
+        print(f"\n{a} -> {b}")
+        print(transition_matrix(counts, i).to_string())
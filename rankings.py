@@ -0,0 +1,53 @@
+import pandas as pd
+
+import data_coverage
+
+
+# =========================
+# 每年排名表（所有指标一次算完）
+# =========================
+RANK_METRICS = ("ccii", "gwe", "gwghg")
+
+
+def build_rank_table(df, metrics=RANK_METRICS):
+    """Rank every country within each year for all metrics in one pass.
+
+    Returns a compact long table indexed by (metric, year) with columns
+    ``country``, ``rank`` (1 = highest) and ``value``. Missing values are
+    dropped, matching ``groupby("year")[metric].rank(...)`` on the wide frame.
+    """
+    long = df.melt(
+        id_vars=["country", "year"],
+        value_vars=list(metrics),
+        var_name="metric",
+        value_name="value",
+    ).dropna(subset=["value"])
+
+    long["rank"] = (
+        long
+        .groupby(["metric", "year"], sort=False)["value"]
+        .rank(method="first", ascending=False)
+        .astype("int16")
+    )
+    long["metric"] = pd.Categorical(long["metric"], categories=list(metrics))
+
+    return (
+        long
+        .sort_values(["metric", "year", "rank"])
+        .set_index(["metric", "year"])
+        [["country", "rank", "value"]]
+    )
+
+
+def top_n(rank_table, metric, n=10):
+    """Rows of ``metric`` ranked within the top ``n``, ordered for line plots."""
+    rows = rank_table.loc[metric]
+    rows = rows[rows["rank"] <= n].reset_index()
+    return rows.sort_values(["country", "year"])
+
+
+def build_complete_rank_table(df, coverage, metric):
+    """Rank table for ``metric`` over countries with data in every year only."""
+    years = data_coverage.years_with_data(coverage, metric, "country")
+    complete = years.index[years == coverage["year"].nunique()]
+    return build_rank_table(df[df["country"].isin(complete)], metrics=[metric])
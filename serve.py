@@ -0,0 +1,113 @@
+"""Start the dashboard with its data and figure caches already warm.
+
+    python serve.py                        # warm up, then serve app.py
+    python serve.py --server.port 8080     # other options go to streamlit run
+    python serve.py --profile              # print startup timings, do not serve
+
+The app runs in this process, so the modules imported, the figures
+rendered and the app's ``st.cache_resource`` loaders (process-wide) filled
+here are the ones its sessions use. Warm-up ends with one full run of the
+app, so the first visitor's run costs what any later one does. Streamlit
+only binds its port (and so only answers /_stcore/health) once warm-up has
+finished, which keeps a load balancer from routing to a cold replica.
+"""
+import contextlib
+import importlib
+import os
+import sys
+import time
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# 按导入顺序计时，后面的模块不再重复计入前面已加载的依赖
+HEAVY_MODULES = (
+    "pandas",
+    "pyarrow",
+    "plotly.graph_objects",
+    "plotly.express",
+    "streamlit",
+    "data_store",
+    "figures",
+    "rankings",
+    "export_static",
+    "like_counter",
+)
+
+
+@contextlib.contextmanager
+def timed(timings, name):
+    start = time.perf_counter()
+    yield
+    timings.append((name, time.perf_counter() - start))
+
+
+# =========================
+# 预热
+# =========================
+def import_modules(timings):
+    for name in HEAVY_MODULES:
+        with timed(timings, f"import {name}"):
+            importlib.import_module(name)
+
+
+def warm_up(timings):
+    """Publish the datasets, build the cube, render every country map, run the app once."""
+    import cube
+    import data_store
+    import figures
+
+    with timed(timings, "ingest + publish"):
+        versions = data_store.publish_all()
+    with timed(timings, "aggregate cube"):
+        cube.build_cube(versions["firm"])
+    with timed(timings, "load country"):
+        version = versions["country"]
+        df = data_store.load_dataset("country", version)
+    years = sorted(df["year"].unique())
+    with timed(timings, f"render maps ({len(figures.INDICATOR_CONFIG) * (len(years) + 1)})"):
+        # 缓存键与 app.py 中 figures.choropleth 的调用一致
+        for indicator in figures.INDICATOR_CONFIG:
+            figures.choropleth(df, indicator, figures.ANIMATED, None, version)
+            for year in years:
+                figures.choropleth(df, indicator, figures.SINGLE_YEAR, year, version)
+    # 完整跑一次 app：填满 app.py 里各个 cache_resource 加载函数、启动数据监测线程
+    run_app(timings, "first app run")
+
+
+def run_app(timings, label):
+    """One run of app.py in a fresh session, in this process."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_FILE, default_timeout=120)
+    with timed(timings, label):
+        at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    profile = "--profile" in argv
+    if profile:
+        argv.remove("--profile")
+
+    timings = []
+    start = time.perf_counter()
+    import_modules(timings)
+    warm_up(timings)
+    if profile:
+        # 新会话的一次运行：预热后应与后续重跑相当
+        run_app(timings, "new session after warm-up")
+    timings.append(("total", time.perf_counter() - start))
+
+    for name, seconds in timings:
+        print(f"{name:32s} {seconds * 1e3:8.0f}ms", file=sys.stderr)
+    if profile:
+        return 0
+
+    from streamlit.web import cli
+    return cli.main(["run", APP_FILE, *argv], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+# =========================
+# 每个指标、每年的汇总统计（一次算完，供四象限分界与标注位置使用）
+# =========================
+ALL_YEARS = "all"
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+COLUMNS = ("count", "mean", "median", "min", "max", "p10", "p25", "p75", "p90")
+
+
+def _summarise(grouped):
+    out = grouped.agg(["count", "mean", "min", "max"])
+    quantiles = grouped.quantile(list(PERCENTILES)).unstack()
+    for q in PERCENTILES:
+        out["median" if q == 0.5 else f"p{round(q * 100)}"] = quantiles[q]
+    return out
+
+
+def build_stats_table(df, metrics):
+    """Summary statistics of each metric per year and over all years.
+
+    Returns a table indexed by (metric, year) with the columns in COLUMNS;
+    the all-years row of each metric has year ``ALL_YEARS``. Missing
+    values are ignored.
+    """
+    long = df.melt(id_vars=["year"], value_vars=list(metrics),
+                   var_name="metric", value_name="value").dropna(subset=["value"])
+    long["year"] = long["year"].astype(int)
+    long["value"] = long["value"].astype(np.float64)
+
+    per_year = _summarise(long.groupby(["metric", "year"])["value"])
+    overall = _summarise(long.groupby("metric")["value"])
+    overall.index = pd.MultiIndex.from_product([overall.index, [ALL_YEARS]],
+                                               names=["metric", "year"])
+    table = pd.concat([per_year, overall])[list(COLUMNS)]
+    return table.reindex(list(metrics), level="metric")
+
+
+def metric_stats(stats, metric, year=ALL_YEARS):
+    """One row of the table as a Series (count, mean, median, ...)."""
+    return stats.loc[(metric, year)]
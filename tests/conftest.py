@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cube  # noqa: E402
+import data_store  # noqa: E402
+
+
+FIRM_COLUMNS = ["year", "country", "continent", "industry",
+                "enscore", "enero91v", "ccii", "gwe", "gwghg"]
+PLACES = [("argentina", "south america"), ("usa", "north america"), ("germany", "europe")]
+INDUSTRIES = ["services", "apparel", "fossil fuels"]
+
+
+def firm_rows(years, places=PLACES, industries=INDUSTRIES, firms=3, seed=0):
+    """Synthetic firm-level rows in the layout of ``all data.csv``."""
+    rng = np.random.default_rng(seed)
+    rows = [
+        (year, country, continent, industry)
+        for year in years
+        for country, continent in places
+        for industry in industries
+        for _ in range(firms)
+    ]
+    df = pd.DataFrame(rows, columns=FIRM_COLUMNS[:4])
+    for column in FIRM_COLUMNS[4:]:
+        values = rng.normal(size=len(df)).round(6)
+        values[rng.random(len(df)) < 0.2] = np.nan
+        df[column] = values
+    # 打乱顺序，导入时的排序才会起作用
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def append_csv(path, df):
+    with open(path, "a", newline="") as f:
+        df.to_csv(f, index=False, header=False)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory with its own cache; returns the firm CSV path."""
+    cache = tmp_path / ".data_cache"
+    monkeypatch.setattr(data_store, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(data_store, "CACHE_DIR", str(cache))
+    monkeypatch.setattr(data_store, "MANIFEST_FILE", str(cache / "manifest.json"))
+    monkeypatch.setattr(data_store, "SHM_DIR", None)
+    monkeypatch.setattr(cube, "CUBE_FILE", str(cache / "cube.arrow"))
+    path = tmp_path / data_store.DATASETS["firm"]
+    firm_rows(range(2011, 2014)).to_csv(path, index=False)
+    return path
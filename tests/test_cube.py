@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pandas as pd
+
+import cube
+import data_store
+from conftest import append_csv, firm_rows
+
+
+def build(force=False):
+    return cube.build_cube(data_store.publish("firm"), force=force)
+
+
+def assert_matches_rebuild():
+    version = data_store.publish("firm")
+    frame = cube.read_cube_frame(version)
+    cube.build_cube(version, force=True)
+    pd.testing.assert_frame_equal(frame, cube.read_cube_frame(version))
+
+
+def test_unchanged_data_is_not_rebuilt(data_dir):
+    assert build() == [2011, 2012, 2013]
+    assert build() == []
+
+
+def test_append_rebuilds_only_touched_years(data_dir):
+    build()
+    append_csv(data_dir, firm_rows([2012, 2014], places=[("chile", "south america")], seed=4))
+    assert build() == [2012, 2014]
+    assert_matches_rebuild()
+
+
+def test_edited_year_is_rebuilt(data_dir):
+    build()
+    df = pd.read_csv(data_dir)
+    row = df.index[(df["year"] == 2013) & df["ccii"].notna()][0]
+    df.loc[row, "ccii"] += 1
+    df.to_csv(data_dir, index=False)
+    assert build() == [2013]
+    assert_matches_rebuild()
+
+
+def test_removed_year_is_dropped(data_dir):
+    build()
+    df = pd.read_csv(data_dir)
+    df[df["year"] != 2011].to_csv(data_dir, index=False)
+    assert build() == []
+    frame = cube.read_cube_frame(data_store.publish("firm"))
+    assert 2011 not in set(frame["year"].dropna())
+    assert data_store.load_manifest()["cube"]["years"].keys() == {"2012", "2013"}
+    assert_matches_rebuild()
+
+
+def test_concurrent_builds_are_serialised(data_dir):
+    version = data_store.publish("firm")
+    errors = []
+
+    def rebuild():
+        try:
+            cube.build_cube(version, force=True)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=rebuild) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert set(data_store.load_manifest()) == {"firm", "cube"}
+    assert_matches_rebuild()
+
+
+def test_watcher_rebuilds_cube_before_swapping_version(data_dir):
+    watcher = data_store.DataWatcher(names=("firm",), interval=60)
+    build()
+    old_version = watcher.version("firm")
+    seen = []
+
+    @watcher.prepare
+    def refresh(name, version):
+        cube.build_cube(version)
+        # 切换前：读者仍看到旧版本，而立方体已包含新数据
+        seen.append((watcher.version(name), cube.build_cube(version)))
+
+    append_csv(data_dir, firm_rows([2014], seed=5))
+    watcher.check()  # 第一次只记下新的文件状态
+    assert watcher.check() == ["firm"]
+    assert seen == [(old_version, [])]
+    assert watcher.version("firm") != old_version
+    assert 2014 in set(cube.read_cube_frame(watcher.version("firm"))["year"].dropna())
+
+
+def test_reads_do_not_wait_for_ingest(data_dir):
+    version = data_store.publish("firm")
+    build()
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with data_store.ingest_lock:
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    try:
+        start = time.perf_counter()
+        cube.open_cube(version)
+        data_store.load_dataset("firm", version)
+        assert time.perf_counter() - start < 5
+    finally:
+        release.set()
+        holder.join()
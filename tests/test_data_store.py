@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+import data_store
+from conftest import append_csv, firm_rows
+
+
+def ingested(name="firm"):
+    version = data_store.publish(name)
+    return data_store.load_dataset(name, version), data_store.load_coverage(name, version)
+
+
+def assert_matches_rebuild(name="firm"):
+    """The cached data equals what a full ingest of the same CSV produces."""
+    frame, coverage = ingested(name)
+    assert data_store.ingest(name, force=True) == "rebuilt"
+    expected, expected_coverage = ingested(name)
+    pd.testing.assert_frame_equal(frame, expected)
+    pd.testing.assert_frame_equal(coverage, expected_coverage)
+
+
+def test_append_parses_only_new_rows(data_dir):
+    assert data_store.ingest("firm") == "rebuilt"
+    rows = data_store.load_manifest()["firm"]["rows"]
+
+    extra = firm_rows([2014], seed=1)
+    append_csv(data_dir, extra)
+    assert data_store.ingest("firm") == "appended"
+    entry = data_store.load_manifest()["firm"]
+    assert entry["rows"] == rows + len(extra)
+    # 追加路径算出的哈希与整文件哈希一致，下次调用直接判定为最新
+    assert entry["sha256"] == data_store.file_hash(data_dir)
+    assert data_store.ingest("firm") is False
+    assert_matches_rebuild()
+
+
+def test_append_merges_new_categories(data_dir):
+    data_store.ingest("firm")
+    extra = firm_rows([2012, 2014], places=[("chile", "south america"), ("usa", "north america")],
+                      industries=["retail", "services"], seed=2)
+    append_csv(data_dir, extra)
+    assert data_store.ingest("firm") == "appended"
+
+    df = data_store.load_dataset("firm", data_store.publish("firm"))
+    assert {"chile", "usa"} <= set(df["country"].cat.categories)
+    assert "retail" in set(df["industry"].cat.categories)
+    # 新旧行合并后仍按 SORT_KEYS 排序
+    keys = data_store.SORT_KEYS["firm"]
+    order = df[keys].astype({k: str for k in keys if k != "year"})
+    assert order.equals(order.sort_values(keys, kind="stable", ignore_index=True))
+    assert_matches_rebuild()
+
+
+def test_rewritten_prefix_forces_rebuild(data_dir):
+    data_store.ingest("firm")
+    entry = data_store.load_manifest()["firm"]
+    text = data_dir.read_text()
+    # 改动旧内容（长度不变）再追加一行：不能当作追加处理
+    data_dir.write_text(text.replace("argentina", "Argentina", 1)
+                        + text.splitlines(keepends=True)[1])
+    assert data_store.read_appended("firm", entry) is None
+    assert data_store.ingest("firm") == "rebuilt"
+    assert_matches_rebuild()
+
+
+def test_partial_last_line_waits_for_newline(data_dir):
+    data_store.ingest("firm")
+    size = data_store.load_manifest()["firm"]["size"]
+    rows = data_store.load_manifest()["firm"]["rows"]
+
+    lines = firm_rows([2014], seed=3).to_csv(index=False, header=False).splitlines(keepends=True)
+    complete, partial = lines[0], lines[1]
+    cut = len(partial) // 2
+    with open(data_dir, "a", newline="") as f:
+        f.write(complete + partial[:cut])
+    assert data_store.ingest("firm") == "appended"
+    entry = data_store.load_manifest()["firm"]
+    assert entry["rows"] == rows + 1
+    assert entry["size"] == size + len(complete.encode())
+
+    with open(data_dir, "a", newline="") as f:
+        f.write(partial[cut:])
+    assert data_store.ingest("firm") == "appended"
+    assert data_store.load_manifest()["firm"]["rows"] == rows + 2
+    assert_matches_rebuild()
+
+
+def test_readers_never_ingest(data_dir):
+    version = data_store.publish("firm")
+    entry = data_store.load_manifest()["firm"]
+    # CSV 正在被改写（截断）时，按版本读取的仍是已发布的数据
+    data_dir.write_text(data_dir.read_text()[:200])
+    assert len(data_store.load_dataset("firm", version)) == entry["rows"]
+    assert data_store.load_coverage("firm", version)["rows"].sum() == entry["rows"]
+    assert data_store.unmatched_countries("firm", version) == entry["unmatched_countries"]
+    assert data_store.load_manifest()["firm"] == entry
+
+
+def test_publish_keeps_previous_version(data_dir):
+    versions = [data_store.publish("firm")]
+    for seed in (6, 7):
+        append_csv(data_dir, firm_rows([2014], seed=seed))
+        versions.append(data_store.publish("firm"))
+    assert len(set(versions)) == 3
+    oldest, previous, current = versions
+    assert len(data_store.load_dataset("firm", previous)) < len(
+        data_store.load_dataset("firm", current))
+    with pytest.raises(FileNotFoundError):
+        data_store.dataset_info("firm", oldest)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from conftest import FIRM_COLUMNS
+from firm_query import open_firm_query
+
+
+@pytest.fixture
+def engine(data_dir):
+    return open_firm_query(data_store.publish("firm"))
+
+
+@pytest.fixture
+def firms(data_dir):
+    return pd.read_csv(data_dir)[FIRM_COLUMNS]
+
+
+def test_select_year_slices(engine, firms):
+    assert engine.years == [2011, 2012, 2013]
+    table = engine.select(year=2012)
+    assert table.num_rows == (firms["year"] == 2012).sum()
+    assert set(table.column("year").to_pylist()) == {2012}
+
+
+def test_select_deduplicates_and_normalises_years(engine, firms):
+    expected = firms["year"].isin([2011, 2013]).sum()
+    assert engine.select(year=[2013, 2011, 2013]).num_rows == expected
+    assert engine.select(year=["2011", 2013, 2011]).num_rows == expected
+    assert engine.select(year=[1999]).num_rows == 0
+
+
+def test_select_filters_dimensions(engine, firms):
+    table = engine.select(columns=["country", "industry"], country=["usa", "germany"],
+                          industry="apparel")
+    expected = firms[firms["country"].isin(["usa", "germany"])
+                     & (firms["industry"] == "apparel")]
+    assert table.column_names == ["country", "industry"]
+    assert table.num_rows == len(expected)
+
+
+def test_aggregate_matches_pandas(engine, firms):
+    result = engine.aggregate(["continent", "year"], metrics=["ccii", "gwe"],
+                              stats=["mean", "count", "median"], year=[2012, 2012, 2013])
+    subset = firms[firms["year"].isin([2012, 2013])]
+    grouped = subset.groupby(["continent", "year"])[["ccii", "gwe"]]
+    expected = pd.concat([
+        grouped.mean().add_suffix("_mean"),
+        grouped.count().add_suffix("_count"),
+        grouped.median().add_suffix("_median"),
+    ], axis=1).reset_index()
+
+    assert len(result) == len(expected)
+    for column in ("ccii_count", "gwe_count"):
+        np.testing.assert_array_equal(result[column], expected[column])
+    for column in ("ccii_mean", "gwe_mean", "ccii_median", "gwe_median"):
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-5)
+
+
+def test_aggregate_rejects_unknown_stat(engine):
+    with pytest.raises(ValueError):
+        engine.aggregate("year", stats=["mode"])
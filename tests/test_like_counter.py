@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import like_counter
+
+
+class FlakyStore(like_counter.CounterStore):
+    """CounterStore whose next ``failures`` writes raise."""
+
+    def __init__(self, path, failures=0):
+        super().__init__(path, ttl=0)
+        self.failures = failures
+
+    def add_many(self, deltas):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().add_many(deltas)
+
+
+class SlowStore(like_counter.CounterStore):
+    """CounterStore that stalls after committing, before add_many returns."""
+
+    def __init__(self, path):
+        super().__init__(path, ttl=0)
+        self.committed = threading.Event()
+        self.release = threading.Event()
+
+    def add_many(self, deltas):
+        values = super().add_many(deltas)
+        self.committed.set()
+        self.release.wait(5)
+        return values
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "counter.db")
+
+
+def make_counter(store):
+    # 间隔足够长，后台线程不会在测试中途自行写入
+    return like_counter.WriteBehindCounter(store, interval=60, max_pending=10**6)
+
+
+def test_flush_persists_pending(db_path):
+    store = like_counter.CounterStore(db_path, ttl=0)
+    base = store.read()
+    counter = make_counter(store)
+    for _ in range(3):
+        counter.increment("like")
+    counter.increment("really_like", 2)
+    assert counter.read() == {"like": base["like"] + 3,
+                              "really_like": base["really_like"] + 2}
+
+    counter.flush()
+    assert counter.pending() == {"like": 0, "really_like": 0}
+    assert store.read() == {"like": base["like"] + 3,
+                            "really_like": base["really_like"] + 2}
+    counter.close()
+
+
+def test_failed_flush_keeps_deltas_for_retry(db_path):
+    store = FlakyStore(db_path, failures=1)
+    base = store.read()
+    counter = make_counter(store)
+    counter.increment("like", 5)
+
+    with pytest.raises(sqlite3.OperationalError):
+        counter.flush()
+    assert counter.pending()["like"] == 5
+    assert store.read()["like"] == base["like"]
+    assert counter.read()["like"] == base["like"] + 5
+
+    counter.flush()
+    assert counter.pending()["like"] == 0
+    assert store.read()["like"] == base["like"] + 5
+    counter.close()
+
+
+def test_read_during_flush_does_not_wait_or_double_count(db_path):
+    store = SlowStore(db_path)
+    base = store.read()["like"]
+    counter = make_counter(store)
+    counter.increment("like", 4)
+
+    flusher = threading.Thread(target=counter.flush)
+    flusher.start()
+    assert store.committed.wait(5)
+
+    # 库已提交、flush 尚未返回：读取立即返回，且这批点赞只计一次
+    start = time.perf_counter()
+    assert counter.read()["like"] == base + 4
+    counter.refresh()
+    assert counter.read()["like"] == base + 4
+    assert time.perf_counter() - start < 1
+
+    store.release.set()
+    flusher.join(5)
+    assert counter.read()["like"] == base + 4
+    counter.close()
+
+
+def test_refresh_picks_up_other_processes(db_path):
+    store = like_counter.CounterStore(db_path, ttl=0)
+    counter = make_counter(store)
+    base = counter.read()["like"]
+    counter.increment("like")
+
+    like_counter.CounterStore(db_path, ttl=0).add_many({"like": 10})
+    assert counter.read()["like"] == base + 1
+    counter.refresh()
+    assert counter.read()["like"] == base + 11
+    counter.flush()
+    assert counter.read()["like"] == base + 11
+    counter.close()